@@ -1,64 +1,771 @@
 import os
+import re
+import io
+import csv
 import json
+import uuid
+import hashlib
+import sqlite3
 import random
+import tempfile
 import string
 import datetime
 import smtplib
+import time
+import queue
+import atexit
+import cProfile
+import hmac
+import pstats
+import threading
+import logging
+import logging.handlers
+from collections import OrderedDict, deque
+from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
-import requests
-from requests_oauthlib import OAuth1
+import click
 
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
+from flask import (Flask, Response, abort, g, render_template, request, redirect, url_for, flash, jsonify,
+                   session, stream_template, stream_with_context)
 from flask_sqlalchemy import SQLAlchemy
-from openai import OpenAI
+from sqlalchemy import create_engine, event, orm
+from sqlalchemy.engine import Engine, make_url
+from itsdangerous import BadSignature, Signer
+from jinja2 import FileSystemBytecodeCache
+from jinja2.environment import TemplateStream
+from markupsafe import Markup
 from werkzeug.utils import secure_filename
 
 ###############################################
 # SETUP & CONFIG
 ###############################################
-# Use your real key or environment variable in production.
-client = OpenAI(api_key="sk-proj-XXXXX")
-
 app = Flask(__name__)
 app.secret_key = "SUPERSECRETKEY"  # Replace with a secure key in production
 
 base_dir = os.path.abspath(os.path.dirname(__file__))
 db_path = os.path.join(base_dir, "campaigns.db")
 
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + db_path
+# DATABASE_URL selects the backend (e.g. postgresql+psycopg://user:pw@host/impacthub);
+# it defaults to the local SQLite file. See "DATABASE ENGINE" below.
+database_url = os.environ.get("DATABASE_URL", "sqlite:///" + db_path)
+if database_url.startswith("postgres://"):
+    database_url = "postgresql://" + database_url[len("postgres://"):]
+app.config["SQLALCHEMY_DATABASE_URI"] = database_url
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
+# Use your real key or environment variable in production. The OpenAI client is
+# created on first use (see get_openai_client).
+app.config["OPENAI_API_KEY"] = os.environ.get("OPENAI_API_KEY", "sk-proj-XXXXX")
+app.config["OPENAI_BASE_URL"] = os.environ.get("OPENAI_BASE_URL") or None
+
+# SQLite tuning, applied on every new connection.
+app.config["SQLITE_JOURNAL_MODE"] = os.environ.get("SQLITE_JOURNAL_MODE", "WAL")
+app.config["SQLITE_SYNCHRONOUS"] = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+app.config["SQLITE_BUSY_TIMEOUT_MS"] = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 15000))
+app.config["SQLITE_MMAP_SIZE"] = int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+
+# Connection pool (both backends).
+app.config["DB_POOL_SIZE"] = int(os.environ.get("DB_POOL_SIZE", 10))
+app.config["DB_MAX_OVERFLOW"] = int(os.environ.get("DB_MAX_OVERFLOW", 20))
+app.config["DB_POOL_TIMEOUT"] = int(os.environ.get("DB_POOL_TIMEOUT", 30))
+app.config["DB_POOL_RECYCLE"] = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+app.config["DB_COPY_CHUNK"] = int(os.environ.get("DB_COPY_CHUNK", 5000))
+
+# Per-request profiling (see RequestProfiler). Send "X-Profile: <PROFILE_TOKEN>" or
+# ?_profile=<PROFILE_TOKEN> to profile one request; PROFILE_SAMPLE_RATE profiles a
+# random fraction of all requests. Empty token = on-demand profiling disabled.
+# /admin/profiles takes the same X-Profile header (or ?token= from a plain browser).
+app.config["PROFILE_TOKEN"] = os.environ.get("PROFILE_TOKEN", "")
+app.config["PROFILE_SAMPLE_RATE"] = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+app.config["PROFILE_KEEP"] = int(os.environ.get("PROFILE_KEEP", 50))
+app.config["PROFILE_MAX_QUERIES"] = int(os.environ.get("PROFILE_MAX_QUERIES", 500))
+
 UPLOAD_FOLDER = os.path.join(base_dir, "uploads")
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 
-db = SQLAlchemy(app)
+# Uploaded materials are stored once per content hash (see store_material).
+app.config["MATERIALS_FOLDER"] = os.environ.get("MATERIALS_FOLDER", os.path.join(UPLOAD_FOLDER, "materials"))
+app.config["UPLOAD_CHUNK_SIZE"] = int(os.environ.get("UPLOAD_CHUNK_SIZE", 1024 * 1024))
+
+# Tracking hits are buffered in-process and written in bulk (see TrackingBuffer).
+app.config["TRACKING_FLUSH_INTERVAL_MS"] = int(os.environ.get("TRACKING_FLUSH_INTERVAL_MS", 500))
+app.config["TRACKING_FLUSH_MAX_EVENTS"] = int(os.environ.get("TRACKING_FLUSH_MAX_EVENTS", 1000))
+app.config["TRACKING_QUEUE_MAXSIZE"] = int(os.environ.get("TRACKING_QUEUE_MAXSIZE", 100000))
+
+# Worker pool for GPT jobs (see submit_campaign_job) and token refreshes.
+app.config["JOB_WORKERS"] = int(os.environ.get("JOB_WORKERS", 4))
+# Separate pool for mailings and recipient imports, which can run for many
+# minutes: they never hold a slot the GPT jobs or token refreshes need.
+app.config["BULK_JOB_WORKERS"] = int(os.environ.get("BULK_JOB_WORKERS", 2))
+
+# A worker holds a lease on each job it runs and renews it every
+# JOB_HEARTBEAT_INTERVAL seconds (see JobLeases). Jobs whose lease lapsed for
+# JOB_LEASE_SECONDS belong to a dead worker and can be resumed or retried.
+app.config["JOB_LEASE_SECONDS"] = int(os.environ.get("JOB_LEASE_SECONDS", 60))
+app.config["JOB_HEARTBEAT_INTERVAL"] = float(os.environ.get("JOB_HEARTBEAT_INTERVAL", 15))
+
+# The plan job saves the streamed text every PLAN_FLUSH_INTERVAL seconds; the
+# live page's event stream polls it every PLAN_STREAM_POLL_INTERVAL seconds.
+app.config["PLAN_FLUSH_INTERVAL"] = float(os.environ.get("PLAN_FLUSH_INTERVAL", 0.5))
+app.config["PLAN_STREAM_POLL_INTERVAL"] = float(os.environ.get("PLAN_STREAM_POLL_INTERVAL", 0.5))
+
+# "AI Fill All" fans out one GPT call per field (see fan_out_field_suggestions).
+# AI_FILL_FIELD_TIMEOUT bounds every field suggestion call, /ai_suggest included.
+app.config["AI_FILL_CONCURRENCY"] = int(os.environ.get("AI_FILL_CONCURRENCY", 6))
+app.config["AI_FILL_FIELD_TIMEOUT"] = float(os.environ.get("AI_FILL_FIELD_TIMEOUT", 45))
+
+# Prompt generation after a materials upload runs as a background job, split into
+# GPT calls of PROMPT_CHUNK_SIZE prompts each (see job_generate_prompts).
+app.config["PROMPT_CHUNK_SIZE"] = int(os.environ.get("PROMPT_CHUNK_SIZE", 10))
+app.config["PROMPT_CONCURRENCY"] = int(os.environ.get("PROMPT_CONCURRENCY", 6))
+
+# Memoization of field suggestions (see TTLCache). Set SUGGESTION_CACHE_SHARED_PATH
+# to a SQLite file so all gunicorn workers share cache hits.
+app.config["SUGGESTION_CACHE_SIZE"] = int(os.environ.get("SUGGESTION_CACHE_SIZE", 2048))
+app.config["SUGGESTION_CACHE_TTL"] = int(os.environ.get("SUGGESTION_CACHE_TTL", 6 * 3600))
+app.config["SUGGESTION_CACHE_SHARED_PATH"] = os.environ.get("SUGGESTION_CACHE_SHARED_PATH", "")
+# Expired rows in the shared tier are deleted at most once per this many seconds
+# per worker; reads already skip them, so this only bounds the file's size.
+app.config["SUGGESTION_CACHE_SWEEP_INTERVAL"] = int(os.environ.get("SUGGESTION_CACHE_SWEEP_INTERVAL", 300))
+
+# Compiled templates are kept across restarts and shared by workers
+# (TEMPLATE_BYTECODE_CACHE=0 disables). They go in Jinja's per-user, owner-only
+# directory under the temp dir unless TEMPLATE_BYTECODE_CACHE_DIR names another;
+# cached bytecode is executed as-is, so that must be writable by this user only.
+# Rendered campaign fragments are memoized in process (see render_fragment);
+# entries are keyed on Campaign.version.
+app.config["TEMPLATE_BYTECODE_CACHE"] = os.environ.get("TEMPLATE_BYTECODE_CACHE", "1") == "1"
+app.config["TEMPLATE_BYTECODE_CACHE_DIR"] = os.environ.get("TEMPLATE_BYTECODE_CACHE_DIR", "")
+app.config["FRAGMENT_CACHE_SIZE"] = int(os.environ.get("FRAGMENT_CACHE_SIZE", 1024))
+app.config["FRAGMENT_CACHE_TTL"] = int(os.environ.get("FRAGMENT_CACHE_TTL", 3600))
+
+# Outgoing mail (see SmtpDeliveryEngine). SMTP_RATE_PER_HOST is messages/second, 0 = unlimited.
+app.config["SMTP_POOL_SIZE"] = int(os.environ.get("SMTP_POOL_SIZE", 8))
+app.config["SMTP_RATE_PER_HOST"] = float(os.environ.get("SMTP_RATE_PER_HOST", 50))
+app.config["SMTP_MAX_RETRIES"] = int(os.environ.get("SMTP_MAX_RETRIES", 2))
+app.config["SMTP_TIMEOUT"] = float(os.environ.get("SMTP_TIMEOUT", 30))
+app.config["MAILING_CHECKPOINT_EVERY"] = int(os.environ.get("MAILING_CHECKPOINT_EVERY", 200))
+app.config["RECIPIENT_IMPORT_CHUNK"] = int(os.environ.get("RECIPIENT_IMPORT_CHUNK", 5000))
+
+# Tweets are posted through a persistent queue (see TweetScheduler). Point
+# TWITTER_API_URL at a local stub to exercise it without touching Twitter.
+app.config["TWITTER_API_URL"] = os.environ.get("TWITTER_API_URL", "https://api.twitter.com/2/tweets")
+app.config["TWITTER_TIMEOUT"] = float(os.environ.get("TWITTER_TIMEOUT", 15))
+app.config["TWEET_MAX_RETRIES"] = int(os.environ.get("TWEET_MAX_RETRIES", 3))
+app.config["TWEET_POLL_INTERVAL"] = float(os.environ.get("TWEET_POLL_INTERVAL", 30))
+# A tweet claimed for posting longer ago than this is assumed orphaned (its
+# worker died mid-post) and is queued again. Keep it well above TWITTER_TIMEOUT.
+app.config["TWEET_CLAIM_TIMEOUT"] = float(os.environ.get("TWEET_CLAIM_TIMEOUT", 300))
+# Every web worker starts its scheduler on its first request. Set to 0 to post
+# only from cron instead: flask --app app post-scheduled-tweets
+app.config["TWEET_SCHEDULER_AUTOSTART"] = os.environ.get("TWEET_SCHEDULER_AUTOSTART", "1") == "1"
+
+# DocuSign access tokens are cached in the database and renewed this many seconds
+# before they expire (see ServiceTokenCache).
+app.config["DOCUSIGN_TOKEN_REFRESH_AHEAD"] = int(os.environ.get("DOCUSIGN_TOKEN_REFRESH_AHEAD", 300))
+app.config["DOCUSIGN_TOKEN_LEASE"] = int(os.environ.get("DOCUSIGN_TOKEN_LEASE", 30))
+
+# Campaign list pages are keyset-paginated on (created_at, id) (see campaign_keyset_page).
+app.config["CAMPAIGN_PAGE_SIZE"] = int(os.environ.get("CAMPAIGN_PAGE_SIZE", 50))
+app.config["CAMPAIGN_PAGE_SIZE_MAX"] = int(os.environ.get("CAMPAIGN_PAGE_SIZE_MAX", 500))
+
+# send_emails_sim streams its link table, reading recipients in batches of this size.
+app.config["TRACKING_LINK_BATCH"] = int(os.environ.get("TRACKING_LINK_BATCH", 1000))
+
+# Logging (see configure_logging). LOG_LEVELS sets per-logger levels, e.g.
+# "impacthub.ai=DEBUG,impacthub.mail=WARNING". GPT payloads are only logged at
+# DEBUG, for a LOG_PAYLOAD_SAMPLE_RATE fraction of calls, cut to LOG_PAYLOAD_MAX_CHARS.
+app.config["LOG_LEVEL"] = os.environ.get("LOG_LEVEL", "INFO")
+app.config["LOG_LEVELS"] = os.environ.get("LOG_LEVELS", "")
+app.config["LOG_FORMAT"] = os.environ.get("LOG_FORMAT", "json")
+app.config["LOG_PAYLOAD_SAMPLE_RATE"] = float(os.environ.get("LOG_PAYLOAD_SAMPLE_RATE", 0.01))
+app.config["LOG_PAYLOAD_MAX_CHARS"] = int(os.environ.get("LOG_PAYLOAD_MAX_CHARS", 2000))
+
+###############################################
+# LOGGING
+###############################################
+log = logging.getLogger("impacthub")
+ai_log = logging.getLogger("impacthub.ai")
+jobs_log = logging.getLogger("impacthub.jobs")
+mail_log = logging.getLogger("impacthub.mail")
+tracking_log = logging.getLogger("impacthub.tracking")
+twitter_log = logging.getLogger("impacthub.twitter")
+docusign_log = logging.getLogger("impacthub.docusign")
+
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: ts, level, logger, msg, any `extra` fields and
+    the formatted exception, if any.
+    """
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.utcfromtimestamp(record.created).isoformat(timespec="milliseconds") + "Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread: the calling
+    thread only resolves the message arguments and enqueues the record.
+    """
+    def prepare(self, record):
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+_log_listener = None
+
+def configure_logging():
+    """
+    Routes the "impacthub" loggers through an unbounded in-memory queue; a
+    listener thread formats and writes them to stderr, so a log call never
+    blocks the request thread on I/O. Idempotent.
+    """
+    global _log_listener
+    if _log_listener is not None:
+        return
+    handler = logging.StreamHandler()
+    if app.config["LOG_FORMAT"] == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    log_queue = queue.SimpleQueue()
+    _log_listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+
+    log.addHandler(DeferredQueueHandler(log_queue))
+    log.setLevel(app.config["LOG_LEVEL"].upper())
+    log.propagate = False
+    for item in app.config["LOG_LEVELS"].split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            logging.getLogger(name.strip()).setLevel(level.strip().upper())
+
+def log_payload(logger, message, payload, **fields):
+    """
+    Logs a (possibly large) payload at DEBUG for a sampled fraction of calls,
+    compactly serialized and truncated. Costs nothing when DEBUG is off.
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    if random.random() >= app.config["LOG_PAYLOAD_SAMPLE_RATE"]:
+        return
+    text = payload if isinstance(payload, str) else json.dumps(payload, default=str)
+    limit = app.config["LOG_PAYLOAD_MAX_CHARS"]
+    if len(text) > limit:
+        fields["payload_chars"] = len(text)
+        text = text[:limit] + "..."
+    logger.debug(message, extra=dict(fields, payload=text))
+
+def clip(value, limit=200):
+    """Shortens user-supplied strings for log fields."""
+    value = str(value or "")
+    return value if len(value) <= limit else value[:limit] + "..."
+
+def engine_options(uri):
+    """
+    SQLAlchemy engine options for a database URI: pool sizing for every
+    backend, pre-ping/recycle for server databases, and a busy timeout for
+    file-based SQLite. In-memory SQLite keeps Flask-SQLAlchemy's defaults.
+    """
+    url = make_url(uri)
+    if url.get_backend_name() == "sqlite":
+        if url.database in (None, "", ":memory:"):
+            return {}
+        return {
+            "pool_size": app.config["DB_POOL_SIZE"],
+            "max_overflow": app.config["DB_MAX_OVERFLOW"],
+            "pool_timeout": app.config["DB_POOL_TIMEOUT"],
+            "connect_args": {"timeout": app.config["SQLITE_BUSY_TIMEOUT_MS"] / 1000},
+        }
+    return {
+        "pool_size": app.config["DB_POOL_SIZE"],
+        "max_overflow": app.config["DB_MAX_OVERFLOW"],
+        "pool_timeout": app.config["DB_POOL_TIMEOUT"],
+        "pool_recycle": app.config["DB_POOL_RECYCLE"],
+        "pool_pre_ping": True,
+    }
+
+# Bound to the app in init_app().
+db = SQLAlchemy()
+
+###############################################
+# DATABASE ENGINE
+###############################################
+@event.listens_for(Engine, "connect")
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Tunes every new SQLite connection: WAL lets readers run alongside the
+    tracking/job writers, busy_timeout makes writers wait for the lock instead
+    of failing with "database is locked", synchronous=NORMAL is durable under
+    WAL, and mmap speeds up reads. Other backends are left untouched.
+    """
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cur = dbapi_connection.cursor()
+    try:
+        cur.execute(f"PRAGMA journal_mode={app.config['SQLITE_JOURNAL_MODE']}")
+        cur.execute(f"PRAGMA synchronous={app.config['SQLITE_SYNCHRONOUS']}")
+        cur.execute(f"PRAGMA busy_timeout={int(app.config['SQLITE_BUSY_TIMEOUT_MS'])}")
+        cur.execute(f"PRAGMA mmap_size={int(app.config['SQLITE_MMAP_SIZE'])}")
+    finally:
+        cur.close()
+
+def copy_database(target_url, chunk_size=None, log=print):
+    """
+    Copies every table of the current database into target_url (e.g. a fresh
+    Postgres database), parents before children, streaming rows in chunks.
+    Target tables are created if missing and must be empty. Integer primary
+    key sequences are advanced on Postgres afterwards. Returns {table: rows}.
+    """
+    chunk_size = chunk_size or app.config["DB_COPY_CHUNK"]
+    target = create_engine(target_url, **engine_options(target_url))
+    copied = {}
+    try:
+        db.metadata.create_all(target)
+        with target.connect() as dst:
+            for table in db.metadata.sorted_tables:
+                if dst.execute(db.select(db.func.count()).select_from(table)).scalar():
+                    raise RuntimeError(f"Target table {table.name} is not empty.")
+
+        src = db.session.connection()
+        for table in db.metadata.sorted_tables:
+            result = src.execution_options(yield_per=chunk_size).execute(
+                db.select(table).order_by(*table.primary_key.columns))
+            n = 0
+            with target.begin() as dst:
+                for part in result.mappings().partitions():
+                    dst.execute(table.insert(), [dict(row) for row in part])
+                    n += len(part)
+                if target.dialect.name == "postgresql":
+                    for col in table.primary_key.columns:
+                        if isinstance(col.type, db.Integer) and n:
+                            dst.execute(db.text(
+                                f"SELECT setval(pg_get_serial_sequence('{table.name}', '{col.name}'), "
+                                f"(SELECT MAX({col.name}) FROM {table.name}))"))
+            copied[table.name] = n
+            log(f"{table.name}: {n} row(s)")
+    finally:
+        target.dispose()
+    return copied
+
+@app.cli.command("copy-db")
+@click.argument("target_url")
+@click.option("--chunk-size", type=int, default=None, help="Rows per INSERT batch.")
+def copy_db_command(target_url, chunk_size):
+    """Copy all data from the configured database into TARGET_URL."""
+    # The source is only read: it must already be migrated (flask init-db).
+    missing = missing_schema_objects()
+    if missing:
+        raise click.ClickException(
+            "The source database schema is out of date (missing "
+            + ", ".join(f"{t}.{name}" if name else t for t, name in missing)
+            + "). Run 'flask init-db' against it first.")
+    try:
+        copied = copy_database(target_url, chunk_size)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    print(f"Copied {sum(copied.values())} row(s) across {len(copied)} table(s).")
+
+###############################################
+# METRICS (Prometheus, optional)
+###############################################
+# prometheus_client is optional: without it the metrics below are no-ops and
+# /metrics answers 503. With several gunicorn workers, set
+# PROMETHEUS_MULTIPROC_DIR to an empty directory shared by the workers (and
+# call prometheus_client.multiprocess.mark_process_dead from gunicorn's
+# child_exit hook) so /metrics aggregates every worker.
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+class _NoopMetric:
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+    def observe(self, value):
+        pass
+
+def _metric(kind, name, documentation, labelnames=(), **kwargs):
+    if prometheus_client is None:
+        return _NoopMetric()
+    return getattr(prometheus_client, kind)(name, documentation, labelnames, **kwargs)
+
+HTTP_REQUEST_SECONDS = _metric(
+    "Histogram", "impacthub_http_request_duration_seconds",
+    "Time to produce a response (streamed bodies excluded), by endpoint.",
+    ("method", "endpoint", "status"))
+HTTP_IN_FLIGHT = _metric(
+    "Gauge", "impacthub_http_requests_in_flight", "Requests currently being handled.",
+    multiprocess_mode="livesum")
+LLM_REQUEST_SECONDS = _metric(
+    "Histogram", "impacthub_llm_request_duration_seconds",
+    "Chat completion latency by call site.", ("call_site",),
+    buckets=(0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120))
+LLM_ERRORS = _metric(
+    "Counter", "impacthub_llm_errors_total", "Failed chat completions by call site.", ("call_site",))
+LLM_TOKENS = _metric(
+    "Counter", "impacthub_llm_tokens_total", "Tokens used by call site.", ("call_site", "kind"))
+SMTP_MESSAGES = _metric(
+    "Counter", "impacthub_smtp_messages_total",
+    "Recipients attempted by outcome (sent / failed / deferred).", ("status",))
+SMTP_SEND_SECONDS = _metric(
+    "Histogram", "impacthub_smtp_send_duration_seconds", "Time for one successful SMTP send.",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5))
+DB_COMMIT_SECONDS = _metric(
+    "Histogram", "impacthub_db_commit_duration_seconds",
+    "Session commit latency, including the flush.", ("backend",),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5))
+
+@app.before_request
+def _metrics_before_request():
+    g.request_started = time.perf_counter()
+    HTTP_IN_FLIGHT.inc()
+
+@app.after_request
+def _metrics_after_request(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        HTTP_REQUEST_SECONDS.labels(request.method, request.endpoint or "unmatched",
+                                    str(response.status_code)).observe(time.perf_counter() - started)
+    return response
+
+@app.teardown_request
+def _metrics_teardown_request(exc):
+    HTTP_IN_FLIGHT.dec()
+
+@event.listens_for(orm.Session, "before_commit")
+def _commit_started(sess):
+    sess.info["commit_started"] = time.perf_counter()
+
+@event.listens_for(orm.Session, "after_commit")
+def _commit_finished(sess):
+    started = sess.info.pop("commit_started", None)
+    if started is not None:
+        bind = sess.get_bind()
+        DB_COMMIT_SECONDS.labels(bind.dialect.name).observe(time.perf_counter() - started)
+
+@event.listens_for(orm.Session, "after_rollback")
+def _commit_abandoned(sess):
+    sess.info.pop("commit_started", None)
+
+@app.route("/metrics")
+def metrics():
+    if prometheus_client is None:
+        return "prometheus_client is not installed.", 503
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return Response(prometheus_client.generate_latest(registry),
+                    mimetype=prometheus_client.CONTENT_TYPE_LATEST)
+
+###############################################
+# REQUEST PROFILING
+###############################################
+class RequestProfiler:
+    """
+    Opt-in profiling of single requests: a cProfile CPU profile plus the
+    timing of every SQL statement the request runs. The last PROFILE_KEEP
+    profiles are kept in memory (per worker process) for /admin/profiles.
+    Only one request per process is profiled at a time; others that ask
+    while it runs are served unprofiled. Streamed bodies are not covered.
+    """
+    EXCLUDED_ENDPOINTS = {"metrics", "static", "profiles", "profile_detail", "profile_download"}
+    # Query args that carry the token; never stored with a profile.
+    SECRET_ARGS = {"_profile", "token"}
+
+    def __init__(self, app):
+        self.app = app
+        self.profiles = deque(maxlen=app.config["PROFILE_KEEP"])
+        self._busy = threading.Lock()
+        self._local = threading.local()
+
+    def authorized(self, token):
+        expected = self.app.config["PROFILE_TOKEN"]
+        return bool(expected and token) and hmac.compare_digest(token, expected)
+
+    def wanted(self):
+        if request.endpoint in self.EXCLUDED_ENDPOINTS:
+            return None
+        token = request.headers.get("X-Profile") or request.args.get("_profile")
+        if token and self.authorized(token):
+            return "requested"
+        rate = self.app.config["PROFILE_SAMPLE_RATE"]
+        if rate and random.random() < rate:
+            return "sampled"
+        return None
+
+    @property
+    def current(self):
+        return getattr(self._local, "profile", None)
+
+    def start(self, trigger):
+        if not self._busy.acquire(blocking=False):
+            return
+        prof = {
+            "id": uuid.uuid4().hex[:12],
+            "trigger": trigger,
+            "started_at": datetime.datetime.utcnow(),
+            "method": request.method,
+            "path": self.request_path(),
+            "endpoint": request.endpoint,
+            "queries": [],
+            "query_count": 0,
+            "sql_ms": 0.0,
+            "_t0": time.perf_counter(),
+            "_cprofile": cProfile.Profile(),
+        }
+        self._local.profile = prof
+        prof["_cprofile"].enable()
+
+    def stop(self, status_code=None):
+        prof = self.current
+        if prof is None:
+            return None
+        prof["_cprofile"].disable()
+        self._local.profile = None
+        self._busy.release()
+        prof["duration_ms"] = (time.perf_counter() - prof.pop("_t0")) * 1000
+        prof["status"] = status_code
+        out = io.StringIO()
+        stats = pstats.Stats(prof.pop("_cprofile"), stream=out)
+        prof["raw"] = stats
+        stats.sort_stats("cumulative").print_stats(40)
+        prof["cpu_report"] = out.getvalue()
+        prof["queries"].sort(key=lambda q: q["ms"], reverse=True)
+        self.profiles.appendleft(prof)
+        return prof
+
+    def request_path(self):
+        """The request path and query string, minus any SECRET_ARGS."""
+        args = [(k, v) for k, v in request.args.items(multi=True) if k not in self.SECRET_ARGS]
+        return f"{request.path}?{urlencode(args)}" if args else request.path
+
+    def record_query(self, statement, params, elapsed):
+        prof = self.current
+        if prof is None:
+            return
+        prof["query_count"] += 1
+        prof["sql_ms"] += elapsed * 1000
+        if len(prof["queries"]) < self.app.config["PROFILE_MAX_QUERIES"]:
+            prof["queries"].append({"ms": elapsed * 1000, "sql": statement[:2000],
+                                    "params": repr(params)[:500]})
+
+    def get(self, profile_id):
+        return next((p for p in list(self.profiles) if p["id"] == profile_id), None)
+
+request_profiler = RequestProfiler(app)
+
+@app.before_request
+def _profile_before_request():
+    trigger = request_profiler.wanted()
+    if trigger:
+        request_profiler.start(trigger)
+
+@app.after_request
+def _profile_after_request(response):
+    prof = request_profiler.stop(response.status_code)
+    if prof is not None:
+        response.headers["X-Profile-Id"] = prof["id"]
+    return response
+
+@app.teardown_request
+def _profile_teardown_request(exc):
+    # after_request does not run when the view raised.
+    request_profiler.stop(500)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _profile_query_started(conn, cursor, statement, parameters, context, executemany):
+    if request_profiler.current is not None:
+        conn.info.setdefault("profile_query_started", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _profile_query_finished(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("profile_query_started")
+    if started:
+        request_profiler.record_query(statement, parameters, time.perf_counter() - started.pop())
+
+def require_profile_token():
+    """
+    404s unless the request carries the profile token. The X-Profile header
+    is checked first; ?token= is the fallback for plain browsers. Returns
+    the token to carry in the page's links: None when it came in the header,
+    so header-authenticated pages never put it in a URL.
+    """
+    header = request.headers.get("X-Profile")
+    if header:
+        if not request_profiler.authorized(header):
+            abort(404)
+        return None
+    token = request.args.get("token")
+    if not request_profiler.authorized(token):
+        abort(404)
+    return token
+
+@app.route("/admin/profiles")
+def profiles():
+    token = require_profile_token()
+    return render_template("profiles.html", profiles=list(request_profiler.profiles), token=token)
+
+@app.route("/admin/profiles/<profile_id>")
+def profile_detail(profile_id):
+    token = require_profile_token()
+    prof = request_profiler.get(profile_id) or abort(404)
+    return render_template("profile_detail.html", profile=prof, token=token)
+
+@app.route("/admin/profiles/<profile_id>.prof")
+def profile_download(profile_id):
+    """Raw pstats dump, for snakeviz / python -m pstats."""
+    require_profile_token()
+    prof = request_profiler.get(profile_id) or abort(404)
+    fd, path = tempfile.mkstemp(suffix=".prof")
+    os.close(fd)
+    try:
+        prof["raw"].dump_stats(path)
+        with open(path, "rb") as fh:
+            data = fh.read()
+    finally:
+        os.remove(path)
+    return Response(data, mimetype="application/octet-stream",
+                    headers={"Content-Disposition": f"attachment; filename={profile_id}.prof"})
+
+###############################################
+# OPENAI CLIENT
+###############################################
+_openai_client = None
+_openai_client_lock = threading.Lock()
+
+def get_openai_client():
+    """
+    The shared OpenAI client. The openai package is slow to import, so it is
+    only imported (and the client built) on the first GPT call.
+    """
+    global _openai_client
+    if _openai_client is None:
+        with _openai_client_lock:
+            if _openai_client is None:
+                from openai import OpenAI
+                _openai_client = OpenAI(api_key=app.config["OPENAI_API_KEY"],
+                                        base_url=app.config["OPENAI_BASE_URL"])
+    return _openai_client
+
+def _record_llm_usage(call_site, usage):
+    if usage is None:
+        return
+    LLM_TOKENS.labels(call_site, "prompt").inc(getattr(usage, "prompt_tokens", 0) or 0)
+    LLM_TOKENS.labels(call_site, "completion").inc(getattr(usage, "completion_tokens", 0) or 0)
+
+def llm_chat(call_site, **kwargs):
+    """
+    client.chat.completions.create(**kwargs), recording latency, errors and
+    token usage under `call_site`. Streams are timed until fully consumed.
+    """
+    started = time.perf_counter()
+    try:
+        resp = get_openai_client().chat.completions.create(**kwargs)
+    except Exception:
+        LLM_ERRORS.labels(call_site).inc()
+        LLM_REQUEST_SECONDS.labels(call_site).observe(time.perf_counter() - started)
+        raise
+    if kwargs.get("stream"):
+        return _instrumented_stream(call_site, resp, started)
+    LLM_REQUEST_SECONDS.labels(call_site).observe(time.perf_counter() - started)
+    _record_llm_usage(call_site, getattr(resp, "usage", None))
+    return resp
+
+def _instrumented_stream(call_site, stream, started):
+    try:
+        for chunk in stream:
+            _record_llm_usage(call_site, getattr(chunk, "usage", None))
+            yield chunk
+    except Exception:
+        LLM_ERRORS.labels(call_site).inc()
+        raise
+    finally:
+        LLM_REQUEST_SECONDS.labels(call_site).observe(time.perf_counter() - started)
 
 ###############################################
 # MODELS
 ###############################################
 class Campaign(db.Model):
+    """
+    The large Text columns are deferred in groups and only loaded when first
+    accessed; routes that render them undefer their group up front, e.g.
+    Campaign.query.options(db.undefer_group("content")).
+      "content":   round1/round2 data, round2 questions, campaign plan
+      "prompts":   generated email/tweet prompts
+      "materials": legacy uploaded-materials blob (now CampaignMaterial)
+      "legacy":    pre-RecipientStatus email_list/analytics_data blobs
+    """
+    # List pages are ordered by creation (see campaign_keyset_page).
+    __table_args__ = (
+        db.Index("ix_campaign_created_id", "created_at", "id"),
+    )
     id = db.Column(db.String(8), primary_key=True)
     name = db.Column(db.String(150), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
     start_date = db.Column(db.String(50), nullable=True)
     end_date = db.Column(db.String(50), nullable=True)
 
-    round1_data = db.Column(db.Text, nullable=True)
-    round2_data = db.Column(db.Text, nullable=True)
-    round2_questions = db.Column(db.Text, nullable=True)
+    round1_data = db.deferred(db.Column(db.Text, nullable=True), group="content")
+    round2_data = db.deferred(db.Column(db.Text, nullable=True), group="content")
+    round2_questions = db.deferred(db.Column(db.Text, nullable=True), group="content")
+
+    # Progress is derived from the dates on read (see progress_pct below).
+    # The stored copy is only refreshed by the 'refresh-progress' batch job.
+    stored_progress_pct = db.Column("progress_pct", db.Integer, default=0)
 
-    progress_pct = db.Column(db.Integer, default=0)
+    email_list = db.deferred(db.Column(db.Text, nullable=True), group="legacy")        # legacy JSON array, see RecipientStatus
+    analytics_data = db.deferred(db.Column(db.Text, nullable=True), group="legacy")    # legacy JSON object, see RecipientStatus
 
-    email_list = db.Column(db.Text, nullable=True)        # JSON array of addresses
-    analytics_data = db.Column(db.Text, nullable=True)    # JSON object per recipient
+    materials_json = db.deferred(db.Column(db.Text, nullable=True), group="materials")  # e.g. { "files": [ ... ] }
+    prompts_emails = db.deferred(db.Column(db.Text, nullable=True), group="prompts")    # e.g. [ "Email snippet 1", ... ]
+    prompts_tweets = db.deferred(db.Column(db.Text, nullable=True), group="prompts")    # e.g. [ "Tweet snippet 1", ... ]
 
-    materials_json = db.Column(db.Text, nullable=True)    # e.g. { "files": [ ... ] }
-    prompts_emails = db.Column(db.Text, nullable=True)    # e.g. [ "Email snippet 1", ... ]
-    prompts_tweets = db.Column(db.Text, nullable=True)    # e.g. [ "Tweet snippet 1", ... ]
+    campaign_plan = db.deferred(db.Column(db.Text, nullable=True), group="content")
 
-    campaign_plan = db.Column(db.Text, nullable=True)
+    # Rollups kept current as recipients are imported and tracking hits arrive,
+    # so /analytics never has to scan RecipientStatus.
+    sent_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    opened_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    clicked_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    # Background job bookkeeping: job_status is queued/running/done/failed
+    job_type = db.Column(db.String(30), nullable=True)
+    job_status = db.Column(db.String(20), nullable=True)
+    job_error = db.Column(db.Text, nullable=True)
+    job_lease_owner = db.Column(db.String(32), nullable=True)   # see JobLeases
+    job_lease_until = db.Column(db.DateTime, nullable=True)
+
+    # Bumped whenever a displayed field changes (see bump_campaign_version);
+    # cached page fragments are keyed on it.
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -73,6 +780,27 @@ class Campaign(db.Model):
         if not self.prompts_tweets:
             self.prompts_tweets = json.dumps([])
 
+    @property
+    def progress_pct(self):
+        pct = compute_progress_pct(self.start_date, self.end_date)
+        return pct if pct is not None else (self.stored_progress_pct or 0)
+
+# Campaign fields rendered into cached fragments (campaign cards, summary, prompt lists).
+CAMPAIGN_VERSIONED_FIELDS = ("name", "start_date", "end_date", "round1_data", "round2_data",
+                             "campaign_plan", "prompts_emails", "prompts_tweets")
+
+@event.listens_for(Campaign, "before_update")
+def bump_campaign_version(mapper, connection, target):
+    """
+    Increments Campaign.version in the same UPDATE whenever a flush changes one
+    of CAMPAIGN_VERSIONED_FIELDS, so every cached fragment of the campaign is
+    retired at once. Bulk UPDATEs skip this hook; they only write rollups, the
+    stored progress and job status, which are either not cached or part of the key.
+    """
+    state = db.inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in CAMPAIGN_VERSIONED_FIELDS):
+        target.version = Campaign.version + 1
+
 class EmailBotConfig(db.Model):
     """
     Stores the email sending configuration. We'll assume a single row with id=1 for simplicity.
@@ -104,44 +832,1172 @@ class TwitterBotConfig(db.Model):
     name = db.Column(db.String(150), nullable=False)
     credentials_json = db.Column(db.Text, nullable=False)
 
+class RecipientStatus(db.Model):
+    """
+    One row per (campaign, recipient) holding the open/click state.
+    Replaces the Campaign.analytics_data JSON blob so a tracking hit is a
+    single-row UPDATE instead of a read-modify-write of the whole campaign.
+    The unique constraint doubles as the (campaign_id, email) lookup index.
+    last_import_id is the RecipientImport that last listed the address.
+    """
+    __table_args__ = (
+        db.UniqueConstraint("campaign_id", "email", name="uq_recipient_campaign_email"),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    campaign_id = db.Column(db.String(8), db.ForeignKey("campaign.id"), nullable=False)
+    email = db.Column(db.String(320), nullable=False)
+    opened = db.Column(db.Boolean, nullable=False, default=False)
+    clicked = db.Column(db.Boolean, nullable=False, default=False)
+    opened_at = db.Column(db.DateTime, nullable=True)
+    clicked_at = db.Column(db.DateTime, nullable=True)
+    last_import_id = db.Column(db.Integer, nullable=True)
+
+class RecipientImport(db.Model):
+    """
+    Progress and outcome of one recipient list import (see import_recipients).
+    status: queued / running / done / failed. A queued or running import is
+    only live while its lease is (see JobLeases).
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    campaign_id = db.Column(db.String(8), db.ForeignKey("campaign.id"), nullable=False, index=True)
+    source_name = db.Column(db.String(255), nullable=True)
+    status = db.Column(db.String(20), nullable=False, default="queued")
+    rows_processed = db.Column(db.Integer, nullable=False, default=0)
+    valid = db.Column(db.Integer, nullable=False, default=0)
+    accepted = db.Column(db.Integer, nullable=False, default=0)
+    rejected = db.Column(db.Integer, nullable=False, default=0)
+    rejected_sample = db.Column(db.Text, nullable=True)   # JSON list, capped
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    lease_owner = db.Column(db.String(32), nullable=True)
+    lease_until = db.Column(db.DateTime, nullable=True)
+
+class MailingJob(db.Model):
+    """
+    One send of a message to a campaign's recipient list. The recipient set
+    is snapshotted into MailingRecipient rows when the job is created, and
+    per-recipient delivery state is checkpointed in bulk while it runs, so
+    an interrupted job can be resumed without re-mailing anyone.
+    status: queued / running / done / interrupted. A queued or running job
+    is only live while its lease is (see JobLeases).
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    campaign_id = db.Column(db.String(8), db.ForeignKey("campaign.id"), nullable=False, index=True)
+    kind = db.Column(db.String(20), nullable=False)         # "newsletter" or "snippet"
+    subject = db.Column(db.String(300), nullable=False)
+    body_text = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="queued")
+    total = db.Column(db.Integer, nullable=False, default=0)
+    sent_count = db.Column(db.Integer, nullable=False, default=0)
+    failed_count = db.Column(db.Integer, nullable=False, default=0)
+    deferred_count = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    lease_owner = db.Column(db.String(32), nullable=True)
+    lease_until = db.Column(db.DateTime, nullable=True)
+
+class MailingRecipient(db.Model):
+    """
+    Delivery state of one recipient within a MailingJob:
+    pending / sent / failed (permanent rejection) / deferred (transient error).
+    """
+    __table_args__ = (
+        db.UniqueConstraint("job_id", "email", name="uq_mailing_recipient_job_email"),
+        db.Index("ix_mailing_recipient_job_state", "job_id", "state"),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey("mailing_job.id"), nullable=False)
+    email = db.Column(db.String(320), nullable=False)
+    state = db.Column(db.String(10), nullable=False, default="pending")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+
+class ScheduledTweet(db.Model):
+    """
+    One tweet waiting to be (or already) posted by the TweetScheduler.
+    status: queued / posting / posted / failed. not_before spaces out a batch;
+    account_id is the TwitterBotConfig that posted it. claimed_at is when a
+    scheduler moved it to posting (see requeue_lapsed_tweet_claims).
+    """
+    __table_args__ = (
+        db.Index("ix_scheduled_tweet_status_due", "status", "not_before"),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    campaign_id = db.Column(db.String(8), db.ForeignKey("campaign.id"), nullable=False, index=True)
+    text = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(10), nullable=False, default="queued")
+    not_before = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    account_id = db.Column(db.Integer, nullable=True)
+    tweet_id = db.Column(db.String(64), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    posted_at = db.Column(db.DateTime, nullable=True)
+
+class ServiceToken(db.Model):
+    """
+    Cached access token for an external API, shared by every worker.
+    lease_until/lease_owner mark the one worker currently refreshing it.
+    """
+    name = db.Column(db.String(50), primary_key=True)
+    access_token = db.Column(db.Text, nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=True)
+    lease_until = db.Column(db.DateTime, nullable=True)
+    lease_owner = db.Column(db.String(64), nullable=True)
+
+class Material(db.Model):
+    """
+    One stored file, addressed by the SHA-256 of its content. ref_count is
+    the number of CampaignMaterial rows pointing at it; the file is removed
+    when it drops to zero (see collect_orphan_materials).
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), nullable=False, unique=True)
+    size = db.Column(db.BigInteger, nullable=False, default=0)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+class CampaignMaterial(db.Model):
+    """
+    A campaign's reference to a stored Material, under the uploaded filename.
+    """
+    __table_args__ = (
+        db.UniqueConstraint("campaign_id", "material_id", name="uq_campaign_material"),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    campaign_id = db.Column(db.String(8), db.ForeignKey("campaign.id"), nullable=False, index=True)
+    material_id = db.Column(db.Integer, db.ForeignKey("material.id"), nullable=False, index=True)
+    filename = db.Column(db.String(255), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+
 ###############################################
-# JINJA FILTER: to fix 'loads' error
+# HELPER: Update progress
 ###############################################
-@app.template_filter("json_loads")
-def json_loads_filter(value):
+def compute_progress_pct(start_date, end_date, today=None):
     """
-    Safely parse JSON string into Python object or return empty list/dict on error.
+    Percentage of the campaign's date range that has elapsed, or None if the
+    dates are missing or invalid. Pure function: reads never write progress.
     """
-    if not value:
-        return []
+    if not start_date or not end_date:
+        return None
     try:
-        return json.loads(value)
-    except:
-        return []
+        s = datetime.datetime.strptime(start_date, "%Y-%m-%d").date()
+        e = datetime.datetime.strptime(end_date, "%Y-%m-%d").date()
+    except ValueError:
+        return None
+    t = today or datetime.date.today()
+    if e <= s:
+        return None
+    total_days = (e - s).days
+    elapsed = (t - s).days
+    if elapsed < 0:
+        elapsed = 0
+    if elapsed > total_days:
+        elapsed = total_days
+    fraction = elapsed / total_days
+    return int(fraction * 100)
+
+def update_progress_based_on_dates(campaign):
+    """
+    Refreshes the stored progress column (used by the batch job only).
+    """
+    pct = compute_progress_pct(campaign.start_date, campaign.end_date)
+    if pct is not None:
+        campaign.stored_progress_pct = pct
+
+def refresh_stored_progress(batch_size=500):
+    """
+    Periodic batch job: rewrites stored progress for campaigns whose value
+    changed, in batches. Returns the number of rows updated.
+    """
+    today = datetime.date.today()
+    updated = 0
+    last_id = ""
+    while True:
+        rows = (db.session.query(Campaign.id, Campaign.start_date, Campaign.end_date,
+                                 Campaign.stored_progress_pct)
+                .filter(Campaign.id > last_id)
+                .order_by(Campaign.id)
+                .limit(batch_size)
+                .all())
+        if not rows:
+            break
+        changes = []
+        for cid, start, end, stored in rows:
+            pct = compute_progress_pct(start, end, today)
+            if pct is not None and pct != stored:
+                changes.append({"id": cid, "stored_progress_pct": pct})
+        if changes:
+            db.session.execute(db.update(Campaign), changes)
+            db.session.commit()
+            updated += len(changes)
+        last_id = rows[-1].id
+    return updated
 
 ###############################################
-# HELPER: Update progress
+# HELPER: Campaign list pages
 ###############################################
-def update_progress_based_on_dates(campaign):
-    if not campaign.start_date or not campaign.end_date:
-        return
+def campaign_keyset_page(*columns):
+    """
+    Fetches one page of campaigns in creation order, selecting only `columns`.
+    The page starts after the cursor given in ?after= and holds ?per_page=
+    rows (CAMPAIGN_PAGE_SIZE by default). Seeking on the (created_at, id)
+    index keeps every page an index range scan, however deep. Returns
+    (rows, next_after); next_after is None on the last page.
+    """
+    after = parse_campaign_cursor(request.args.get("after", ""))
     try:
-        import datetime
-        s = datetime.datetime.strptime(campaign.start_date, "%Y-%m-%d").date()
-        e = datetime.datetime.strptime(campaign.end_date, "%Y-%m-%d").date()
-        t = datetime.date.today()
-        if e <= s:
-            return
-        total_days = (e - s).days
-        elapsed = (t - s).days
-        if elapsed < 0:
-            elapsed = 0
-        if elapsed > total_days:
-            elapsed = total_days
-        fraction = elapsed / total_days
-        campaign.progress_pct = int(fraction * 100)
+        size = int(request.args.get("per_page", app.config["CAMPAIGN_PAGE_SIZE"]))
     except ValueError:
-        pass
+        size = app.config["CAMPAIGN_PAGE_SIZE"]
+    size = max(1, min(size, app.config["CAMPAIGN_PAGE_SIZE_MAX"]))
+
+    q = (db.session.query(Campaign.id, Campaign.created_at, *columns)
+         .order_by(Campaign.created_at, Campaign.id))
+    if after:
+        created_at, cid = after
+        q = q.filter(db.or_(Campaign.created_at > created_at,
+                            db.and_(Campaign.created_at == created_at, Campaign.id > cid)))
+    rows = q.limit(size + 1).all()
+    next_after = campaign_cursor(rows[size - 1]) if len(rows) > size else None
+    return rows[:size], next_after
+
+def campaign_cursor(row):
+    """Opaque ?after= value for the row a page ends with: "<created_at>_<id>"."""
+    return f"{row.created_at.isoformat()}_{row.id}"
+
+def parse_campaign_cursor(value):
+    """(created_at, id) from a campaign_cursor() value, or None (first page)."""
+    created_at, _, cid = value.rpartition("_")
+    try:
+        return datetime.datetime.fromisoformat(created_at), cid
+    except ValueError:
+        return None
+
+def row_progress_pct(row):
+    """progress_pct for a projected row carrying the date/progress columns."""
+    pct = compute_progress_pct(row.start_date, row.end_date)
+    return pct if pct is not None else (row.stored_progress_pct or 0)
+
+@app.cli.command("refresh-progress")
+def refresh_progress_command():
+    """Recompute the stored progress_pct column (run daily from cron)."""
+    n = refresh_stored_progress()
+    print(f"Updated progress for {n} campaign(s).")
+
+###############################################
+# HELPER: LRU + TTL cache
+###############################################
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after `ttl` seconds.
+    Values must be JSON-serializable. If `shared_path` is set, entries are
+    also written through to a SQLite file so other worker processes can hit
+    them; a local miss then falls back to the shared tier before giving up.
+    """
+    def __init__(self, namespace, maxsize, ttl, shared_path="", sweep_interval=300):
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.shared_path = shared_path
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if shared_path:
+            with self._shared_conn() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS kv_cache ("
+                    " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS ix_kv_cache_expires_at ON kv_cache (expires_at)"
+                )
+
+    def _shared_conn(self):
+        return sqlite3.connect(self.shared_path, timeout=5)
+
+    def _full_key(self, key):
+        return f"{self.namespace}:{key}"
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+
+        if self.shared_path:
+            try:
+                with self._shared_conn() as conn:
+                    row = conn.execute(
+                        "SELECT value, expires_at FROM kv_cache WHERE key = ? AND expires_at > ?",
+                        (self._full_key(key), now)
+                    ).fetchone()
+            except sqlite3.Error as e:
+                log.warning("Shared cache read failed: %s", e, extra={"cache": self.namespace})
+                row = None
+            if row:
+                value = json.loads(row[0])
+                self._store_local(key, value, row[1])
+                with self._lock:
+                    self.shared_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _store_local(self, key, value, expires_at):
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def _sweep_due(self, now):
+        # Only one thread per process sweeps per interval; the others just write.
+        with self._lock:
+            if now < self._next_sweep:
+                return False
+            self._next_sweep = now + self.sweep_interval
+            return True
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        self._store_local(key, value, expires_at)
+        if self.shared_path:
+            try:
+                with self._shared_conn() as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO kv_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                        (self._full_key(key), json.dumps(value), expires_at)
+                    )
+                    if self._sweep_due(now):
+                        conn.execute("DELETE FROM kv_cache WHERE expires_at <= ?", (now,))
+            except sqlite3.Error as e:
+                log.warning("Shared cache write failed: %s", e, extra={"cache": self.namespace})
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "namespace": self.namespace,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "shared": bool(self.shared_path),
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round((self.hits + self.shared_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+suggestion_cache = TTLCache("suggestions",
+                            maxsize=app.config["SUGGESTION_CACHE_SIZE"],
+                            ttl=app.config["SUGGESTION_CACHE_TTL"],
+                            shared_path=app.config["SUGGESTION_CACHE_SHARED_PATH"],
+                            sweep_interval=app.config["SUGGESTION_CACHE_SWEEP_INTERVAL"])
+
+fragment_cache = TTLCache("fragments",
+                          maxsize=app.config["FRAGMENT_CACHE_SIZE"],
+                          ttl=app.config["FRAGMENT_CACHE_TTL"])
+
+def render_fragment(template_name, key, context):
+    """
+    Renders a partial template once per key and serves the HTML from
+    fragment_cache afterwards. `context` is a callable returning the template
+    context, so a hit also skips building it (deferred column loads,
+    json.loads). The key must change whenever the output would; campaign
+    fragments include Campaign.version.
+    """
+    cache_key = f"{template_name}:{key}"
+    html = fragment_cache.get(cache_key)
+    if html is None:
+        html = render_template(template_name, **context())
+        fragment_cache.set(cache_key, html)
+    return Markup(html)
+
+###############################################
+# RECIPIENT IMPORT (streaming, chunked)
+###############################################
+EMAIL_RE = re.compile(r"^[^@\s,;<>\"']+@[^@\s,;<>\"']+\.[^@\s,;<>\"']+$")
+REJECTED_SAMPLE_MAX = 100
+
+def normalize_email(value):
+    """
+    Strips whitespace, quotes and angle brackets and lowercases the address.
+    Returns None if the result does not look like an email address.
+    """
+    addr = value.strip().strip("\"'").strip()
+    if "<" in addr and addr.endswith(">"):
+        addr = addr[addr.rindex("<") + 1:-1]
+    addr = addr.strip().lower()
+    if len(addr) > 320 or not EMAIL_RE.match(addr):
+        return None
+    return addr
+
+def iter_recipient_rows(text_stream):
+    """
+    Generator over (line_no, cells) for every row of a CSV, TSV or plain
+    comma/newline separated file. The delimiter is sniffed from the first
+    line; only that line is buffered, so memory stays constant.
+    """
+    first = text_stream.readline()
+    if not first:
+        return
+    delimiter = "\t" if "\t" in first else (";" if ";" in first and "," not in first else ",")
+    reader = csv.reader(_prepend_line(first, text_stream), delimiter=delimiter)
+    for row in reader:
+        cells = [cell for cell in row if cell.strip()]
+        if cells:
+            yield reader.line_num, cells
+
+def _prepend_line(first, stream):
+    yield first
+    for line in stream:
+        yield line
+
+def insert_ignore(model, index_elements):
+    """
+    INSERT that silently skips rows violating the unique index, so dedupe
+    across chunks happens in the database instead of in a Python set.
+    """
+    dialect = db.engine.dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert(model).on_conflict_do_nothing(index_elements=index_elements)
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert(model).on_conflict_do_nothing(index_elements=index_elements)
+    return db.insert(model).prefix_with("IGNORE")
+
+def upsert(model, index_elements, update_columns):
+    """
+    INSERT that updates `update_columns` of the existing row instead when it
+    violates the unique index, so the row (and its id) is kept.
+    """
+    dialect = db.engine.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(model)
+        return stmt.on_conflict_do_update(index_elements=index_elements,
+                                          set_={col: stmt.excluded[col] for col in update_columns})
+    from sqlalchemy.dialects.mysql import insert
+    stmt = insert(model)
+    return stmt.on_duplicate_key_update({col: stmt.inserted[col] for col in update_columns})
+
+def import_recipients(campaign_id, text_stream, imp=None):
+    """
+    Replaces a campaign's recipients with the addresses in text_stream.
+    Addresses are normalized, deduplicated and upserted on (campaign_id,
+    email) in chunks of RECIPIENT_IMPORT_CHUNK rows, one transaction per
+    chunk, so recipients already on the list keep their RecipientStatus row,
+    id and tracking state (and the tracking tokens issued for them); rows the
+    new list no longer has are deleted at the end. Progress is recorded on
+    the RecipientImport row `imp` at least every RECIPIENT_IMPORT_CHUNK input
+    rows. Cells without an "@" are treated as other CSV columns; malformed
+    addresses and rows without any address count as rejected, except a
+    header: the first row, when it holds no address. Returns the number of
+    recipients.
+    """
+    chunk_size = app.config["RECIPIENT_IMPORT_CHUNK"]
+    if imp is None:
+        imp = RecipientImport(campaign_id=campaign_id, source_name="(inline)")
+        db.session.add(imp)
+    imp.status = "running"
+    imp.rows_processed = imp.valid = imp.accepted = imp.rejected = 0
+    db.session.commit()
+
+    stmt = upsert(RecipientStatus, ["campaign_id", "email"], ["last_import_id"])
+    rejected_sample = []
+    chunk = {}
+    unflushed_rows = 0
+
+    def reject(line_no, value):
+        imp.rejected += 1
+        if len(rejected_sample) < REJECTED_SAMPLE_MAX:
+            rejected_sample.append(f"line {line_no}: {value[:100]}")
+
+    def flush_chunk():
+        nonlocal unflushed_rows
+        if chunk:
+            db.session.execute(stmt, list(chunk.values()))
+            chunk.clear()
+        imp.rejected_sample = json.dumps(rejected_sample)
+        db.session.commit()
+        unflushed_rows = 0
+
+    for line_no, cells in iter_recipient_rows(text_stream):
+        first_row = imp.rows_processed == 0
+        imp.rows_processed += 1
+        unflushed_rows += 1
+        found = False
+        for cell in cells:
+            addr = normalize_email(cell)
+            if addr:
+                found = True
+                imp.valid += 1
+                chunk.setdefault(addr, {"campaign_id": campaign_id, "email": addr, "last_import_id": imp.id})
+            elif "@" in cell:
+                reject(line_no, cell)
+        if not found and not any("@" in cell for cell in cells) and not first_row:
+            reject(line_no, ",".join(cells))
+        if len(chunk) >= chunk_size or unflushed_rows >= chunk_size:
+            flush_chunk()
+    flush_chunk()
+
+    (RecipientStatus.query
+     .filter(RecipientStatus.campaign_id == campaign_id,
+             db.or_(RecipientStatus.last_import_id.is_(None), RecipientStatus.last_import_id != imp.id))
+     .delete(synchronize_session=False))
+    total, opened, clicked = (db.session.query(db.func.count(RecipientStatus.id),
+                                               db.func.sum(db.cast(RecipientStatus.opened, db.Integer)),
+                                               db.func.sum(db.cast(RecipientStatus.clicked, db.Integer)))
+                              .filter_by(campaign_id=campaign_id).one())
+    (Campaign.query.filter_by(id=campaign_id)
+     .update({"sent_count": total, "opened_count": opened or 0, "clicked_count": clicked or 0},
+             synchronize_session=False))
+    imp.accepted = total
+    imp.status = "done"
+    imp.finished_at = datetime.datetime.utcnow()
+    db.session.commit()
+    return total
+
+def start_recipient_import(campaign_id, source_name):
+    """
+    Creates a RecipientImport held under this worker's job lease. Returns it
+    with the path to spool its source to for run_recipient_import.
+    """
+    import_dir = os.path.join(app.config["UPLOAD_FOLDER"], "imports")
+    os.makedirs(import_dir, exist_ok=True)
+    imp = RecipientImport(campaign_id=campaign_id, source_name=source_name)
+    db.session.add(imp)
+    db.session.commit()
+    job_leases.claim(RecipientImport, imp.id, {"status": "queued"})
+    return imp, os.path.join(import_dir, uuid.uuid4().hex)
+
+def run_recipient_import(flask_app, import_id, path):
+    """
+    Imports the spooled file at `path`, then removes it. The caller must
+    hold the import's lease (see start_recipient_import).
+    """
+    with flask_app.app_context():
+        try:
+            imp = db.session.get(RecipientImport, import_id)
+            if not imp or imp.lease_owner != job_leases.owner:
+                job_leases.forget(RecipientImport, import_id)
+                return
+            with open(path, encoding="utf-8-sig", errors="replace", newline="") as fh:
+                import_recipients(imp.campaign_id, fh, imp)
+            job_leases.release(RecipientImport, import_id, {})
+        except Exception as e:
+            jobs_log.exception("Recipient import failed", extra={"import_id": import_id})
+            db.session.rollback()
+            job_leases.release(RecipientImport, import_id,
+                               {"status": "failed", "error": str(e),
+                                "finished_at": datetime.datetime.utcnow()})
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+_TRACKING_COLUMNS = {"open": ("opened", "opened_count"), "click": ("clicked", "clicked_count")}
+
+def apply_tracking_hits(hits):
+    """
+    Applies {(kind, campaign_id, recipient): timestamp} hits, where recipient
+    is either the RecipientStatus id (signed token links) or the email address
+    (legacy links). Each hit is a single-row UPDATE guarded on the flag still
+    being false, so only the first open/click of a recipient counts; the
+    campaign rollup counters are then bumped once per campaign. Returns the
+    number of recipients flipped. Caller commits.
+    """
+    t = RecipientStatus.__table__
+    stmts = {}
+    for kind, (flag, _) in _TRACKING_COLUMNS.items():
+        for by_id, match in ((True, t.c.id), (False, t.c.email)):
+            stmts[kind, by_id] = (t.update()
+                                  .where(t.c.campaign_id == db.bindparam("b_cid"),
+                                         match == db.bindparam("b_recipient"),
+                                         t.c[flag] == db.false())
+                                  .values({flag: True, f"{flag}_at": db.bindparam("b_ts")}))
+
+    conn = db.session.connection()
+    increments = {}
+    for (kind, cid, recipient), ts in hits.items():
+        stmt = stmts[kind, isinstance(recipient, int)]
+        res = conn.execute(stmt, {"b_cid": cid, "b_recipient": recipient, "b_ts": ts})
+        if res.rowcount:
+            counter = _TRACKING_COLUMNS[kind][1]
+            per_campaign = increments.setdefault(cid, {})
+            per_campaign[counter] = per_campaign.get(counter, 0) + res.rowcount
+
+    ct = Campaign.__table__
+    for cid, counters in increments.items():
+        conn.execute(ct.update()
+                     .where(ct.c.id == cid)
+                     .values({name: ct.c[name] + n for name, n in counters.items()}))
+    return sum(n for counters in increments.values() for n in counters.values())
+
+def record_tracking_hit(campaign_id, recipient, kind):
+    """
+    Synchronously records one open/click hit for a recipient id or email.
+    Returns 1 if it was the recipient's first hit of that kind, else 0.
+    """
+    flipped = apply_tracking_hits({(kind, campaign_id, recipient): datetime.datetime.utcnow()})
+    db.session.commit()
+    return flipped
+
+def recompute_campaign_rollups():
+    """
+    Rebuilds sent/opened/clicked counters from RecipientStatus with one
+    grouped query. Used by migrations; normal operation keeps them current.
+    """
+    rows = (db.session.query(RecipientStatus.campaign_id,
+                             db.func.count(RecipientStatus.id),
+                             db.func.sum(db.cast(RecipientStatus.opened, db.Integer)),
+                             db.func.sum(db.cast(RecipientStatus.clicked, db.Integer)))
+            .group_by(RecipientStatus.campaign_id))
+    counts = {cid: (total, opened or 0, clicked or 0) for cid, total, opened, clicked in rows}
+    changes = []
+    for cid, in db.session.query(Campaign.id):
+        total, opened, clicked = counts.get(cid, (0, 0, 0))
+        changes.append({"id": cid, "sent_count": total, "opened_count": opened, "clicked_count": clicked})
+    if changes:
+        db.session.execute(db.update(Campaign), changes)
+    db.session.commit()
+
+def migrate_analytics_data():
+    """
+    One-off migration: moves the legacy email_list / analytics_data JSON blobs
+    into RecipientStatus rows and clears the blobs afterwards. Campaigns that
+    already have recipient rows are left alone, so it is safe to re-run.
+    Returns the number of campaigns migrated.
+    """
+    migrated = 0
+    legacy = (Campaign.query
+              .options(db.undefer_group("legacy"))
+              .filter(db.or_(Campaign.email_list.notin_(["", "[]"]),
+                             Campaign.analytics_data.notin_(["", "{}"])))
+              .all())
+    for c in legacy:
+        try:
+            e_list = json.loads(c.email_list) if c.email_list else []
+        except ValueError:
+            e_list = []
+        try:
+            ads = json.loads(c.analytics_data) if c.analytics_data else {}
+        except ValueError:
+            ads = {}
+
+        has_rows = db.session.query(RecipientStatus.id).filter_by(campaign_id=c.id).first()
+        if not has_rows:
+            seen = set()
+            rows = []
+            for e in list(e_list) + list(ads.keys()):
+                if e in seen:
+                    continue
+                seen.add(e)
+                state = ads.get(e) or {}
+                rows.append({
+                    "campaign_id": c.id,
+                    "email": e,
+                    "opened": bool(state.get("opened")),
+                    "clicked": bool(state.get("clicked")),
+                })
+            if rows:
+                db.session.execute(db.insert(RecipientStatus), rows)
+            c.sent_count = len(rows)
+            c.opened_count = sum(1 for r in rows if r["opened"])
+            c.clicked_count = sum(1 for r in rows if r["clicked"])
+            migrated += 1
+
+        c.email_list = json.dumps([])
+        c.analytics_data = json.dumps({})
+        db.session.commit()
+    return migrated
+
+###############################################
+# TRACKING INGESTION BUFFER
+###############################################
+class TrackingBuffer:
+    """
+    Write-behind buffer for open/click hits.
+    Requests enqueue (kind, campaign_id, email, timestamp) and return at once;
+    a background thread drains the queue and applies the hits in one bulk
+    transaction every TRACKING_FLUSH_INTERVAL_MS or TRACKING_FLUSH_MAX_EVENTS
+    events, whichever comes first. The queue is bounded by
+    TRACKING_QUEUE_MAXSIZE; when it is full the hit is written synchronously
+    instead of being dropped. Remaining events are flushed at interpreter exit.
+    """
+    def __init__(self, app):
+        self.app = app
+        self.queue = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self.events_flushed = 0
+        self.batches_flushed = 0
+        self.sync_fallbacks = 0
+        self.flush_errors = 0
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.queue = queue.Queue(maxsize=self.app.config["TRACKING_QUEUE_MAXSIZE"])
+            t = threading.Thread(target=self._run, name="tracking-flusher", daemon=True)
+            t.start()
+            self._thread = t
+
+    def enqueue(self, kind, campaign_id, recipient):
+        """
+        Buffers one hit for a recipient id or email. Returns False if it had
+        to be written synchronously.
+        """
+        if self._stopping.is_set():
+            record_tracking_hit(campaign_id, recipient, kind)
+            return False
+        self._ensure_started()
+        try:
+            self.queue.put_nowait((kind, campaign_id, recipient, datetime.datetime.utcnow()))
+            return True
+        except queue.Full:
+            self.sync_fallbacks += 1
+            record_tracking_hit(campaign_id, recipient, kind)
+            return False
+
+    def _collect_batch(self):
+        interval = self.app.config["TRACKING_FLUSH_INTERVAL_MS"] / 1000.0
+        max_events = self.app.config["TRACKING_FLUSH_MAX_EVENTS"]
+        batch = []
+        deadline = time.monotonic() + interval
+        while len(batch) < max_events:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._collect_batch()
+            if batch:
+                self.flush(batch)
+
+    def flush(self, batch):
+        """
+        Applies a batch of hits in a single transaction. Repeated hits on the
+        same recipient collapse into one UPDATE keeping the earliest timestamp.
+        """
+        merged = {}
+        for kind, cid, recipient, ts in batch:
+            key = (kind, cid, recipient)
+            if key not in merged or ts < merged[key]:
+                merged[key] = ts
+
+        with self.app.app_context():
+            try:
+                apply_tracking_hits(merged)
+                db.session.commit()
+                self.events_flushed += len(batch)
+                self.batches_flushed += 1
+            except Exception:
+                db.session.rollback()
+                self.flush_errors += 1
+                tracking_log.exception("Tracking flush failed", extra={"events": len(batch)})
+
+    def stop(self):
+        """
+        Stops the flusher thread and writes out everything still queued.
+        """
+        self._stopping.set()
+        if self._thread is None:
+            return
+        self._thread.join(timeout=5)
+        leftover = []
+        while True:
+            try:
+                leftover.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        if leftover:
+            self.flush(leftover)
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "queue_maxsize": self.app.config["TRACKING_QUEUE_MAXSIZE"],
+            "flush_interval_ms": self.app.config["TRACKING_FLUSH_INTERVAL_MS"],
+            "flush_max_events": self.app.config["TRACKING_FLUSH_MAX_EVENTS"],
+            "events_flushed": self.events_flushed,
+            "batches_flushed": self.batches_flushed,
+            "sync_fallbacks": self.sync_fallbacks,
+            "flush_errors": self.flush_errors,
+        }
+
+tracking_buffer = TrackingBuffer(app)
+atexit.register(tracking_buffer.stop)
+
+def missing_schema_objects():
+    """
+    Read-only schema check: (table, column) pairs the models define but the
+    database lacks, and (table, None) for missing tables.
+    """
+    missing = []
+    insp = db.inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not insp.has_table(table.name):
+            missing.append((table.name, None))
+            continue
+        existing = {col["name"] for col in insp.get_columns(table.name)}
+        missing += [(table.name, col.name) for col in table.columns if col.name not in existing]
+    return missing
+
+def upgrade_schema():
+    """
+    db.create_all() creates missing tables but never alters existing ones.
+    Adds model columns and named indexes that are missing from an existing
+    table. Returns the (table, column or index name) pairs it added.
+    """
+    added = []
+    insp = db.inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not insp.has_table(table.name):
+            continue
+        existing = {col["name"] for col in insp.get_columns(table.name)}
+        for col in table.columns:
+            if col.name in existing:
+                continue
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {col.name} {col.type.compile(db.engine.dialect)}"
+            if col.server_default is not None:
+                ddl += f" DEFAULT {col.server_default.arg}"
+            db.session.execute(db.text(ddl))
+            added.append((table.name, col.name))
+        existing_indexes = {ix["name"] for ix in insp.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(db.session.connection())
+                added.append((table.name, index.name))
+    db.session.commit()
+    return added
+
+def backfill_campaign_created_at():
+    """
+    Gives campaigns created before Campaign.created_at existed a timestamp
+    in their original insertion order (rowid on SQLite), just before now,
+    so the list pages keep the order they had.
+    """
+    order = "rowid" if db.engine.dialect.name == "sqlite" else "id"
+    ids = [r[0] for r in db.session.execute(
+        db.text(f"SELECT id FROM campaign WHERE created_at IS NULL ORDER BY {order}"))]
+    if ids:
+        start = datetime.datetime.utcnow() - datetime.timedelta(seconds=len(ids))
+        db.session.execute(db.update(Campaign), [
+            {"id": cid, "created_at": start + datetime.timedelta(seconds=i)} for i, cid in enumerate(ids)
+        ])
+    db.session.commit()
+    return len(ids)
+
+def init_db():
+    """
+    Creates/upgrades the schema and runs the data migrations.
+    """
+    db.create_all()
+    added = upgrade_schema()
+    migrate_analytics_data()
+    migrate_materials_json()
+    if ("campaign", "sent_count") in added:
+        recompute_campaign_rollups()
+    if ("campaign", "created_at") in added:
+        backfill_campaign_created_at()
+    # Only jobs whose lease lapsed are touched here: live workers may still be
+    # running the others during a rolling deploy.
+    job_leases.reap()
+    # Tweets a live worker is posting keep their claim; only lapsed ones are requeued.
+    requeue_lapsed_tweet_claims()
+    seed_defaults()
+
+def seed_defaults():
+    """
+    Default email config: method=local, pointing at MailHog on localhost:1025.
+    """
+    if not db.session.get(EmailBotConfig, 1):
+        db.session.add(EmailBotConfig(
+            id=1,
+            method="local",
+            smtp_host="localhost",
+            smtp_port="1025",
+            smtp_user="",
+            smtp_pass="",
+            sender_email="noreply@example.org"
+        ))
+        db.session.commit()
+
+@app.cli.command("init-db")
+def init_db_command():
+    """Create/upgrade tables and migrate legacy data."""
+    init_db()
+    print("Database initialized.")
+
+@app.cli.command("migrate-analytics")
+def migrate_analytics_command():
+    """Move legacy analytics_data/email_list blobs into the recipient table."""
+    db.create_all()
+    upgrade_schema()
+    n = migrate_analytics_data()
+    print(f"Migrated {n} campaign(s) to RecipientStatus.")
+
+###############################################
+# BACKGROUND JOBS
+###############################################
+ACTIVE_JOB_STATES = ("queued", "running")
+JOB_LOST_ERROR = "Interrupted: the worker running this job stopped."
+# What a job whose lease lapsed becomes: campaign jobs fail (and offer a
+# retry), mailings are interrupted (and offer a resume).
+JOB_LOST_STATES = {
+    Campaign: {"job_status": "failed", "job_error": JOB_LOST_ERROR},
+    MailingJob: {"status": "interrupted", "error": JOB_LOST_ERROR},
+    RecipientImport: {"status": "failed", "error": JOB_LOST_ERROR},
+}
+
+class JobLeases:
+    """
+    Tracks which worker process owns each background job. Claiming a job
+    stamps its row with this process's owner id and a lease JOB_LEASE_SECONDS
+    long, in one guarded UPDATE (as in ServiceTokenCache) that only succeeds
+    if the job is not active or its lease has lapsed. A heartbeat thread
+    renews the leases of every job held here until it is released, so a
+    job's lease only lapses when the worker running it crashed or restarted.
+    The heartbeat also reaps lapsed jobs (see reap); request handlers only
+    report them (see report_lapsed_job), since GET routes never commit.
+    """
+    def __init__(self, app):
+        self.app = app
+        self.owner = uuid.uuid4().hex
+        self._held = set()          # (model, job id)
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+        self.renewals = 0
+
+    @staticmethod
+    def columns(model):
+        """(status, lease_owner, lease_until) columns of a leased job model."""
+        if model is Campaign:
+            return Campaign.job_status, Campaign.job_lease_owner, Campaign.job_lease_until
+        return model.status, model.lease_owner, model.lease_until
+
+    def _lease_until(self):
+        return datetime.datetime.utcnow() + datetime.timedelta(seconds=self.app.config["JOB_LEASE_SECONDS"])
+
+    def claim(self, model, job_id, values):
+        """
+        Applies `values` (the new queued state) and takes the lease, unless a
+        live worker holds the job. Returns True if this process now owns it.
+        """
+        status, owner, until = self.columns(model)
+        now = datetime.datetime.utcnow()
+        claimed = (model.query
+                   .filter(model.id == job_id,
+                           db.or_(status.is_(None), status.notin_(ACTIVE_JOB_STATES),
+                                  until.is_(None), until < now))
+                   .update(dict(values, **{owner.key: self.owner, until.key: self._lease_until()}),
+                           synchronize_session=False))
+        db.session.commit()
+        if claimed:
+            with self._lock:
+                self._held.add((model, job_id))
+            self._ensure_started()
+        return bool(claimed)
+
+    def release(self, model, job_id, values):
+        """
+        Writes the job's final state and drops the lease, if still held here.
+        """
+        _, owner, until = self.columns(model)
+        (model.query
+         .filter(model.id == job_id, owner == self.owner)
+         .update(dict(values, **{owner.key: None, until.key: None}), synchronize_session=False))
+        db.session.commit()
+        self.forget(model, job_id)
+
+    def forget(self, model, job_id):
+        with self._lock:
+            self._held.discard((model, job_id))
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            t = threading.Thread(target=self._run, name="job-heartbeat", daemon=True)
+            t.start()
+            self._thread = t
+
+    def _run(self):
+        while not self._stopping.wait(self.app.config["JOB_HEARTBEAT_INTERVAL"]):
+            try:
+                self.renew()
+                with self.app.app_context():
+                    self.reap()
+            except Exception:
+                jobs_log.exception("Renewing job leases failed")
+
+    def renew(self):
+        """Extends the lease of every job held by this process."""
+        with self._lock:
+            held = list(self._held)
+        if not held:
+            return
+        with self.app.app_context():
+            until_value = self._lease_until()
+            for model in {m for m, _ in held}:
+                ids = [job_id for m, job_id in held if m is model]
+                _, owner, until = self.columns(model)
+                (model.query
+                 .filter(model.id.in_(ids), owner == self.owner)
+                 .update({until.key: until_value}, synchronize_session=False))
+            db.session.commit()
+        self.renewals += 1
+
+    def reap(self):
+        """
+        Writes JOB_LOST_STATES to every queued/running job whose lease
+        lapsed, and drops the lease, so its old owner is fenced out.
+        """
+        now = datetime.datetime.utcnow()
+        for model, values in JOB_LOST_STATES.items():
+            status, owner, until = self.columns(model)
+            (model.query
+             .filter(status.in_(ACTIVE_JOB_STATES), db.or_(until.is_(None), until < now))
+             .update(dict(values, **{owner.key: None, until.key: None}), synchronize_session=False))
+        db.session.commit()
+
+    def stop(self):
+        self._stopping.set()
+
+job_leases = JobLeases(app)
+atexit.register(job_leases.stop)
+
+def report_lapsed_job(row):
+    """
+    Shows a loaded Campaign or MailingJob whose job lease lapsed in its
+    JOB_LOST_STATES state, without writing it: the values are set as if
+    loaded, so they are never flushed. JobLeases.reap persists them.
+    """
+    model = type(row)
+    status, _, until = JobLeases.columns(model)
+    if not job_lease_lapsed(getattr(row, status.key), getattr(row, until.key)):
+        return row
+    for key, value in JOB_LOST_STATES[model].items():
+        orm.attributes.set_committed_value(row, key, value)
+    return row
+
+def job_lease_lapsed(status, lease_until):
+    return status in ACTIVE_JOB_STATES and (lease_until is None or lease_until < datetime.datetime.utcnow())
+
+job_executor = ThreadPoolExecutor(max_workers=app.config["JOB_WORKERS"],
+                                  thread_name_prefix="campaign-job")
+bulk_executor = ThreadPoolExecutor(max_workers=app.config["BULK_JOB_WORKERS"],
+                                   thread_name_prefix="bulk-job")
+
+def submit_campaign_job(campaign, job_type, fn, *args):
+    """
+    Queues fn(campaign, *args) on the worker pool under a job lease. The job
+    state lives on the Campaign row so any worker process can report it.
+    Returns False, without queueing, while another job of the campaign is live.
+    """
+    values = {"job_type": job_type, "job_status": "queued", "job_error": None}
+    if not job_leases.claim(Campaign, campaign.id, values):
+        return False
+    db.session.expire(campaign)
+    job_executor.submit(_run_campaign_job, app, campaign.id, fn, args)
+    return True
+
+def _run_campaign_job(flask_app, campaign_id, fn, args):
+    with flask_app.app_context():
+        c = db.session.get(Campaign, campaign_id)
+        if not c or c.job_lease_owner != job_leases.owner:
+            job_leases.forget(Campaign, campaign_id)
+            return
+        c.job_status = "running"
+        db.session.commit()
+        try:
+            fn(c, *args)
+            job_leases.release(Campaign, campaign_id, {"job_status": "done"})
+        except Exception as e:
+            jobs_log.exception("Campaign job failed", extra={"job_type": c.job_type, "campaign_id": campaign_id})
+            db.session.rollback()
+            job_leases.release(Campaign, campaign_id, {"job_status": "failed", "job_error": str(e)})
+
+def campaign_job_next_url(c):
+    """
+    Where the user should land once the campaign's current job is done.
+    """
+    if c.job_type == "round2_questions":
+        return url_for("gpt_questions", campaign_id=c.id)
+    return url_for("final_campaign_details", campaign_id=c.id)
+
+def job_round2_questions(c):
+    r1_dict = json.loads(c.round1_data) if c.round1_data else {}
+    q_json = get_additional_questions(r1_dict)
+    c.round2_questions = json.dumps(q_json)
+
+def job_campaign_plan(c):
+    """
+    Streams the plan into Campaign.campaign_plan, committing the text so far
+    at most every PLAN_FLUSH_INTERVAL seconds so campaign_plan_stream (in any
+    worker process) can tail it. If the completion fails, the partial plan is
+    kept and the job can be retried from the details page.
+    """
+    r1_dict = json.loads(c.round1_data) if c.round1_data else {}
+    r2_dict = json.loads(c.round2_data) if c.round2_data else {}
+    interval = app.config["PLAN_FLUSH_INTERVAL"]
+    parts = []
+    c.campaign_plan = ""
+    db.session.commit()
+    last_flush = time.monotonic()
+    try:
+        for delta in stream_campaign_plan(r1_dict, r2_dict):
+            parts.append(delta)
+            if time.monotonic() - last_flush >= interval:
+                c.campaign_plan = "".join(parts)
+                db.session.commit()
+                last_flush = time.monotonic()
+    except Exception:
+        # Keep what arrived; _run_campaign_job then marks the job failed.
+        db.session.rollback()
+        c.campaign_plan = "".join(parts)
+        db.session.commit()
+        raise
+    c.campaign_plan = "".join(parts).strip()
 
 ###############################################
 # PLACEHOLDER ROUTES for /dashboard /pull_all_contracts_ios
@@ -165,15 +2021,25 @@ def pull_all_contracts_ios():
 ###############################################
 @app.route("/")
 def main_page():
-    return render_template("combined.html", page="main")
+    return render_template("main.html")
 
 @app.route("/campaign_overview")
 def campaign_overview():
-    all_campaigns = Campaign.query.all()
-    for c in all_campaigns:
-        update_progress_based_on_dates(c)
-    db.session.commit()
-    return render_template("combined.html", page="campaign_overview", campaigns=all_campaigns)
+    rows, next_after = campaign_keyset_page(Campaign.name, Campaign.start_date, Campaign.end_date,
+                                            Campaign.stored_progress_pct, Campaign.version)
+    campaigns = [{
+        "id": r.id,
+        "name": r.name,
+        "start_date": r.start_date,
+        "end_date": r.end_date,
+        "progress_pct": row_progress_pct(r)
+    } for r in rows]
+    # Names and dates are covered by the version; progress moves with the calendar.
+    key = hashlib.sha1(json.dumps([(r.id, r.version, c["progress_pct"])
+                                   for r, c in zip(rows, campaigns)]).encode()).hexdigest()
+    cards_html = render_fragment("_campaign_cards.html", key, lambda: {"campaigns": campaigns})
+    return render_template("campaign_overview.html", campaigns=campaigns, cards_html=cards_html,
+                           next_after=next_after)
 
 @app.route("/create_campaign", methods=["GET","POST"])
 def create_campaign():
@@ -204,23 +2070,20 @@ def create_campaign():
             end_date=e_date,
             round1_data=json.dumps(round1_json)
         )
-        db.session.add(new_c)
-        db.session.commit()
-
-        q_json = get_additional_questions(round1_json)
-        new_c.round2_questions = json.dumps(q_json)
         update_progress_based_on_dates(new_c)
+        db.session.add(new_c)
         db.session.commit()
 
-        return redirect(url_for("gpt_questions", campaign_id=cid))
+        submit_campaign_job(new_c, "round2_questions", job_round2_questions)
+        return redirect(url_for("campaign_job", campaign_id=cid))
 
-    return render_template("combined.html", page="create_campaign")
+    return render_template("create_campaign.html")
 
 @app.route("/gpt_questions/<campaign_id>", methods=["GET","POST"])
 def gpt_questions(campaign_id):
-    c = Campaign.query.get_or_404(campaign_id)
-    update_progress_based_on_dates(c)
-    db.session.commit()
+    c = report_lapsed_job(Campaign.query.options(db.undefer_group("content")).get_or_404(campaign_id))
+    if c.job_type == "round2_questions" and c.job_status in ACTIVE_JOB_STATES:
+        return redirect(url_for("campaign_job", campaign_id=c.id))
 
     try:
         q_data = json.loads(c.round2_questions) or {}
@@ -245,144 +2108,339 @@ def gpt_questions(campaign_id):
                 answers[fld] = ans
 
         c.round2_data = json.dumps(answers)
-        db.session.commit()
+        if not submit_campaign_job(c, "campaign_plan", job_campaign_plan):
+            flash("A job is already running for this campaign.", "warning")
+            return redirect(url_for("campaign_job", campaign_id=c.id))
+        return redirect(url_for("campaign_plan_live", campaign_id=c.id))
 
-        plan_md = generate_campaign_plan(r1_dict, answers)
-        c.campaign_plan = plan_md
-        db.session.commit()
-        update_progress_based_on_dates(c)
-        db.session.commit()
-
-        return redirect(url_for("final_campaign_details", campaign_id=c.id))
-
-    return render_template("combined.html",
-                           page="gpt_questions",
+    return render_template("gpt_questions.html",
                            questions=q_data.get("questions", []),
                            campaign=c,
                            r1_dict=r1_dict)
 
-@app.route("/final_campaign_details/<campaign_id>")
-def final_campaign_details(campaign_id):
+@app.route("/campaign_job/<campaign_id>")
+def campaign_job(campaign_id):
+    """
+    Waiting page shown while a campaign's background job runs.
+    Polls campaign_job_status and moves on once the job is done.
+    """
+    c = report_lapsed_job(Campaign.query.get_or_404(campaign_id))
+    next_url = campaign_job_next_url(c)
+    if c.job_status in (None, "done"):
+        return redirect(next_url)
+    if c.job_type == "campaign_plan" and c.job_status in ACTIVE_JOB_STATES:
+        return redirect(url_for("campaign_plan_live", campaign_id=c.id))
+    return render_template("campaign_job.html", campaign=c, next_url=next_url)
+
+@app.route("/campaign_job/<campaign_id>/status")
+def campaign_job_status(campaign_id):
+    c = report_lapsed_job(Campaign.query.get_or_404(campaign_id))
+    return jsonify({
+        "job_type": c.job_type,
+        "job_status": c.job_status,
+        "job_error": c.job_error,
+        "next_url": campaign_job_next_url(c)
+    })
+
+def sse_event(event, data, event_id=None):
+    prefix = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{prefix}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route("/campaign_plan_live/<campaign_id>")
+def campaign_plan_live(campaign_id):
+    """
+    Page that renders the campaign plan as it streams in.
+    """
     c = Campaign.query.get_or_404(campaign_id)
-    r1 = json.loads(c.round1_data) if c.round1_data else {}
-    r2 = json.loads(c.round2_data) if c.round2_data else {}
-
-    update_progress_based_on_dates(c)
-    db.session.commit()
+    return render_template("campaign_plan_live.html", campaign=c)
 
-    email_prompts = json.loads(c.prompts_emails) if c.prompts_emails else []
-    tweet_prompts = json.loads(c.prompts_tweets) if c.prompts_tweets else []
+@app.route("/campaign_plan_stream/<campaign_id>")
+def campaign_plan_stream(campaign_id):
+    """
+    Server-sent events tailing the plan that job_campaign_plan writes: each
+    'token' event carries the text added since the last poll and its end
+    offset as the event id, so a reconnecting EventSource resumes from
+    Last-Event-ID while a fresh page load replays from 0. Ends with 'done'
+    (and the next URL) or 'error' once the job stops. Closing the page only
+    stops the tail; the job keeps running.
+    """
+    c = Campaign.query.get_or_404(campaign_id)
+    cid = c.id
+    next_url = url_for("final_campaign_details", campaign_id=cid)
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    try:
+        offset = max(0, int(request.headers.get("Last-Event-ID", 0)))
+    except ValueError:
+        offset = 0
+    interval = app.config["PLAN_STREAM_POLL_INTERVAL"]
+
+    def tail():
+        nonlocal offset
+        while True:
+            row = (db.session.query(Campaign.campaign_plan, Campaign.job_type, Campaign.job_status,
+                                    Campaign.job_error, Campaign.job_lease_until)
+                   .filter_by(id=cid).first())
+            # End the read transaction so the next poll sees new commits.
+            db.session.rollback()
+            if row is None:
+                yield sse_event("error", {"message": "The campaign no longer exists.",
+                                          "next_url": url_for("campaign_overview")})
+                return
+            text = row.campaign_plan or ""
+            if len(text) < offset:
+                # The plan was regenerated since this client last saw it.
+                offset = 0
+                yield sse_event("reset", {})
+            if len(text) > offset:
+                yield sse_event("token", {"text": text[offset:]}, event_id=len(text))
+                offset = len(text)
+            if row.job_type != "campaign_plan" or row.job_status == "done":
+                yield sse_event("done", {"next_url": next_url})
+                return
+            if job_lease_lapsed(row.job_status, row.job_lease_until):
+                yield sse_event("error", {"message": JOB_LOST_ERROR, "next_url": next_url})
+                return
+            if row.job_status not in ACTIVE_JOB_STATES:
+                yield sse_event("error", {"message": row.job_error or "Generating the plan failed.",
+                                          "next_url": next_url})
+                return
+            time.sleep(interval)
+
+    return Response(stream_with_context(tail()), mimetype="text/event-stream", headers=headers)
+
+@app.route("/campaign_plan_retry/<campaign_id>", methods=["POST"])
+def campaign_plan_retry(campaign_id):
+    """
+    Starts the plan job again after it failed or was interrupted.
+    """
+    c = Campaign.query.get_or_404(campaign_id)
+    if not submit_campaign_job(c, "campaign_plan", job_campaign_plan):
+        flash("A job is already running for this campaign.", "warning")
+        return redirect(url_for("campaign_job", campaign_id=c.id))
+    return redirect(url_for("campaign_plan_live", campaign_id=c.id))
 
-    return render_template("combined.html",
-                           page="final_campaign_details",
+@app.route("/final_campaign_details/<campaign_id>")
+def final_campaign_details(campaign_id):
+    # The content and prompt columns stay deferred: they are only loaded (and
+    # parsed) when a fragment has to be rendered for a new Campaign.version.
+    c = report_lapsed_job(Campaign.query.get_or_404(campaign_id))
+    plan_state = c.job_status if c.job_type == "campaign_plan" else None
+    summary_html = render_fragment("_campaign_summary.html", f"{c.id}:{c.version}:{plan_state}", lambda: {
+        "campaign": c,
+        "r1": json.loads(c.round1_data) if c.round1_data else {},
+        "r2": json.loads(c.round2_data) if c.round2_data else {},
+    })
+    email_prompts_html = render_fragment("_email_prompts.html", f"{c.id}:{c.version}", lambda: {
+        "campaign": c,
+        "emails": json.loads(c.prompts_emails) if c.prompts_emails else [],
+    })
+    tweet_prompts_html = render_fragment("_tweet_prompts.html", f"{c.id}:{c.version}", lambda: {
+        "campaign": c,
+        "tweets": json.loads(c.prompts_tweets) if c.prompts_tweets else [],
+    })
+    mailings = [report_lapsed_job(m) for m in
+                MailingJob.query.filter_by(campaign_id=c.id).order_by(MailingJob.id.desc()).limit(10)]
+    tweet_queue = tweet_queue_counts(c.id)
+
+    return render_template("final_campaign_details.html",
                            campaign=c,
-                           r1=r1,
-                           r2=r2,
-                           emails=email_prompts,
-                           tweets=tweet_prompts)
+                           summary_html=summary_html,
+                           email_prompts_html=email_prompts_html,
+                           tweet_prompts_html=tweet_prompts_html,
+                           mailings=mailings,
+                           tweet_queue=tweet_queue)
 
 @app.route("/email_list/<campaign_id>", methods=["GET","POST"])
 def email_list(campaign_id):
     c = Campaign.query.get_or_404(campaign_id)
     if request.method == "POST":
-        raw = request.form.get("emails","")
-        arr = [x.strip() for x in raw.replace(",", "\n").split("\n") if x.strip()]
-        c.email_list = json.dumps(arr)
-
-        analytics = {}
-        for e in arr:
-            analytics[e] = {"opened": False, "clicked": False}
-        c.analytics_data = json.dumps(analytics)
-        db.session.commit()
-
-        update_progress_based_on_dates(c)
-        db.session.commit()
+        upload = request.files.get("emails_file")
+        if upload and upload.filename:
+            # Large lists: stream the upload to disk and import in the background.
+            imp, path = start_recipient_import(c.id, secure_filename(upload.filename))
+            upload.save(path)
+            bulk_executor.submit(run_recipient_import, app, imp.id, path)
+            return redirect(url_for("recipient_import", import_id=imp.id))
+
+        # Pasted lists are small: imported in this request, through the same path.
+        imp, path = start_recipient_import(c.id, "(pasted list)")
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(request.form.get("emails", "").replace(",", "\n"))
+        run_recipient_import(app, imp.id, path)
+        db.session.refresh(imp)
+        if imp.status == "failed":
+            flash(f"Importing the list failed: {imp.error}", "danger")
+            return redirect(url_for("email_list", campaign_id=c.id))
+        if imp.rejected:
+            flash(f"Imported {imp.accepted} recipients; {imp.rejected} entries were not valid addresses.", "danger")
         return redirect(url_for("send_emails_sim", campaign_id=c.id))
 
-    return render_template("combined.html", page="email_list", campaign=c)
+    return render_template("email_list.html", campaign=c)
+
+@app.route("/recipient_import/<int:import_id>")
+def recipient_import(import_id):
+    imp = report_lapsed_job(RecipientImport.query.get_or_404(import_id))
+    return render_template("recipient_import.html", imp=imp,
+                           rejected=json.loads(imp.rejected_sample or "[]"))
+
+@app.route("/recipient_import/<int:import_id>/status")
+def recipient_import_status(import_id):
+    imp = report_lapsed_job(RecipientImport.query.get_or_404(import_id))
+    return jsonify({
+        "id": imp.id,
+        "campaign_id": imp.campaign_id,
+        "status": imp.status,
+        "rows_processed": imp.rows_processed,
+        "valid": imp.valid,
+        "accepted": imp.accepted,
+        "duplicates": max(0, imp.valid - imp.accepted) if imp.status == "done" else None,
+        "rejected": imp.rejected,
+        "rejected_sample": json.loads(imp.rejected_sample or "[]"),
+        "error": imp.error
+    })
 
 @app.route("/email_center")
 def email_center():
-    all_cs = Campaign.query.all()
-    return render_template("combined.html", page="email_center", campaigns=all_cs)
+    rows, next_after = campaign_keyset_page(Campaign.name)
+    return render_template("email_center.html", campaigns=rows,
+                           next_after=next_after)
+
+###############################################
+# TRACKING LINKS
+###############################################
+def _tracking_signer():
+    return Signer(app.secret_key, salt="tracking-link")
+
+def make_tracking_token(campaign_id, recipient_id):
+    """
+    Compact signed token "<campaign>.<recipient>.<sig>" for tracking links,
+    so recipient addresses never appear in URLs.
+    """
+    return _tracking_signer().sign(f"{campaign_id}.{recipient_id}").decode()
+
+def read_tracking_token(token):
+    """
+    Returns (campaign_id, recipient_id) for a valid token, or None.
+    """
+    try:
+        value = _tracking_signer().unsign(token).decode()
+        cid, rid = value.rsplit(".", 1)
+        return cid, int(rid)
+    except (BadSignature, ValueError):
+        return None
+
+def iter_tracking_links(campaign_id):
+    """
+    Yields {"email", "open_link", "click_link"} per recipient, reading
+    RecipientStatus in keyset batches so memory stays flat for any list size.
+    """
+    # Build each URL prefix once instead of calling url_for twice per recipient.
+    open_prefix = url_for("track_open_token", token="x", _external=True)[:-1]
+    click_prefix = url_for("track_click_token", token="x", _external=True)[:-1]
+    signer = _tracking_signer()
+    batch = app.config["TRACKING_LINK_BATCH"]
+    last_id = 0
+    while True:
+        rows = (db.session.query(RecipientStatus.id, RecipientStatus.email)
+                .filter(RecipientStatus.campaign_id == campaign_id,
+                        RecipientStatus.id > last_id)
+                .order_by(RecipientStatus.id)
+                .limit(batch)
+                .all())
+        if not rows:
+            return
+        for rid, email in rows:
+            token = signer.sign(f"{campaign_id}.{rid}").decode()
+            yield {"email": email,
+                   "open_link": open_prefix + token,
+                   "click_link": click_prefix + token}
+        last_id = rows[-1].id
+
+def stream_page(template_name, buffer_size=100, **context):
+    """
+    Streams a template through flask.stream_template (full template context,
+    template signals), sent in chunks of buffer_size render events.
+    """
+    stream = TemplateStream(stream_template(template_name, **context))
+    stream.enable_buffering(buffer_size)
+    return Response(stream_with_context(stream), mimetype="text/html")
 
 @app.route("/send_emails_sim/<campaign_id>")
 def send_emails_sim(campaign_id):
     c = Campaign.query.get_or_404(campaign_id)
-    arr = json.loads(c.email_list) if c.email_list else []
-
-    links_data = []
-    for e in arr:
-        o_link = url_for("track_open", campaign_id=c.id, email=e, _external=True)
-        clink = url_for("track_click", campaign_id=c.id, email=e, _external=True)
-        links_data.append({"email": e, "open_link": o_link, "click_link": clink})
+    has_recipients = db.session.query(
+        RecipientStatus.query.filter_by(campaign_id=c.id).exists()).scalar()
+
+    return stream_page("send_emails_sim.html",
+                       campaign=c,
+                       has_recipients=has_recipients,
+                       links_data=iter_tracking_links(c.id))
+
+@app.route("/t/o/<token>")
+def track_open_token(token):
+    ids = read_tracking_token(token)
+    if not ids:
+        return "Invalid tracking link.", 404
+    tracking_buffer.enqueue("open", *ids)
+    return "Email opened (simulated). You may close this tab."
 
-    db.session.commit()
-    update_progress_based_on_dates(c)
-    db.session.commit()
-    return render_template("combined.html",
-                           page="send_emails_sim",
-                           campaign=c,
-                           links_data=links_data)
+@app.route("/t/c/<token>")
+def track_click_token(token):
+    ids = read_tracking_token(token)
+    if not ids:
+        return "Invalid tracking link.", 404
+    tracking_buffer.enqueue("click", *ids)
+    return "Pledge button clicked (simulated). You may close this tab."
 
+# Email-in-path links, kept so links from earlier simulations keep working.
 @app.route("/track_open/<campaign_id>/<path:email>")
 def track_open(campaign_id, email):
-    c = Campaign.query.get_or_404(campaign_id)
-    ads = json.loads(c.analytics_data) if c.analytics_data else {}
-    if email in ads:
-        ads[email]["opened"] = True
-    c.analytics_data = json.dumps(ads)
-    db.session.commit()
-
-    update_progress_based_on_dates(c)
-    db.session.commit()
+    tracking_buffer.enqueue("open", campaign_id, email)
     return "Email opened (simulated). You may close this tab."
 
 @app.route("/track_click/<campaign_id>/<path:email>")
 def track_click(campaign_id, email):
-    c = Campaign.query.get_or_404(campaign_id)
-    ads = json.loads(c.analytics_data) if c.analytics_data else {}
-    if email in ads:
-        ads[email]["clicked"] = True
-    c.analytics_data = json.dumps(ads)
-    db.session.commit()
-
-    update_progress_based_on_dates(c)
-    db.session.commit()
+    tracking_buffer.enqueue("click", campaign_id, email)
     return "Pledge button clicked (simulated). You may close this tab."
 
+@app.route("/tracking_buffer_status")
+def tracking_buffer_status():
+    return jsonify(tracking_buffer.stats())
+
 @app.route("/analytics")
 def analytics():
-    all_c = Campaign.query.all()
-    for cc in all_c:
-        update_progress_based_on_dates(cc)
-    db.session.commit()
+    rows, next_after = campaign_keyset_page(Campaign.name, Campaign.start_date, Campaign.end_date,
+                                            Campaign.stored_progress_pct, Campaign.sent_count,
+                                            Campaign.opened_count, Campaign.clicked_count)
 
     summary = []
-    for cc in all_c:
-        e_list = json.loads(cc.email_list) if cc.email_list else []
-        ads = json.loads(cc.analytics_data) if cc.analytics_data else {}
-
-        total_sent = len(e_list)
-        opened = sum(1 for v in ads.values() if v["opened"]) if ads else 0
-        clicked = sum(1 for v in ads.values() if v["clicked"]) if ads else 0
-
+    for cc in rows:
         summary.append({
             "id": cc.id,
             "name": cc.name,
-            "total_sent": total_sent,
-            "opened": opened,
-            "clicked": clicked,
-            "progress_pct": cc.progress_pct
+            "total_sent": cc.sent_count,
+            "opened": cc.opened_count,
+            "clicked": cc.clicked_count,
+            "progress_pct": row_progress_pct(cc)
         })
 
-    return render_template("combined.html", page="analytics", summary=summary)
+    return render_template("analytics.html", summary=summary,
+                           next_after=next_after)
 
 @app.route("/delete_campaign/<campaign_id>", methods=["POST"])
 def delete_campaign(campaign_id):
     c = Campaign.query.get_or_404(campaign_id)
+    RecipientStatus.query.filter_by(campaign_id=c.id).delete(synchronize_session=False)
+    RecipientImport.query.filter_by(campaign_id=c.id).delete(synchronize_session=False)
+    job_ids = db.select(MailingJob.id).filter_by(campaign_id=c.id)
+    MailingRecipient.query.filter(MailingRecipient.job_id.in_(job_ids)).delete(synchronize_session=False)
+    MailingJob.query.filter_by(campaign_id=c.id).delete(synchronize_session=False)
+    ScheduledTweet.query.filter_by(campaign_id=c.id).delete(synchronize_session=False)
+    released = release_campaign_materials(c.id)
     db.session.delete(c)
     db.session.commit()
+    if released:
+        collect_orphan_materials()
     flash("Campaign deleted successfully.", "success")
     return redirect(url_for("campaign_overview"))
 
@@ -397,16 +2455,17 @@ def ai_suggest():
     partial_data = data.get("partialData",{})
     typed_value = data.get("typedValue","")
 
-    print(f"[SERVER] /ai_suggest => field={field_name}, typed_value='{typed_value}', campaign_goal='{campaign_goal}'")
+    ai_log.info("ai_suggest", extra={"field": field_name, "typed_value": clip(typed_value),
+                                     "campaign_goal": clip(campaign_goal)})
 
     try:
         suggestions = ask_gpt_for_field_suggestions(
             campaign_goal, field_name, partial_data, typed_value
         )
-        print(f"[SERVER] /ai_suggest => suggestions:\n{json.dumps(suggestions, indent=2)}")
+        log_payload(ai_log, "ai_suggest suggestions", suggestions, field=field_name)
         return jsonify({"status":"ok","suggestions":suggestions})
     except Exception as e:
-        print("Error in /ai_suggest:", e)
+        ai_log.exception("ai_suggest failed", extra={"field": field_name})
         return jsonify({"status":"error","message":str(e)}), 500
 
 @app.route("/ai_fill_all", methods=["POST"])
@@ -418,7 +2477,8 @@ def ai_fill_all():
     typed_obj = data.get("typedObjective","")
     typed_audience = data.get("typedAudience","")
 
-    print(f"[SERVER] /ai_fill_all => user_goal='{user_goal}', typed_name='{typed_name}', typed_obj='{typed_obj}', typed_audience='{typed_audience}'")
+    ai_log.info("ai_fill_all", extra={"campaign_goal": clip(user_goal), "typed_name": clip(typed_name),
+                                      "typed_objective": clip(typed_obj), "typed_audience": clip(typed_audience)})
 
     try:
         fields_map = {
@@ -426,17 +2486,13 @@ def ai_fill_all():
             "objective": typed_obj,
             "target_audience": typed_audience
         }
-        results = {}
         partial_data = {}
+        results, errors = fan_out_field_suggestions(user_goal, fields_map, partial_data)
 
-        for field_key, typedVal in fields_map.items():
-            suggestions = ask_gpt_for_field_suggestions(user_goal, field_key, partial_data, typedVal)
-            results[field_key] = suggestions
-
-        print("[SERVER] /ai_fill_all => results:\n", json.dumps(results, indent=2))
-        return jsonify({"status":"ok","data":results})
+        log_payload(ai_log, "ai_fill_all results", results, errors=len(errors))
+        return jsonify({"status":"ok","data":results,"errors":errors})
     except Exception as ex:
-        print("Error in /ai_fill_all:", ex)
+        ai_log.exception("ai_fill_all failed")
         return jsonify({"status":"error","message":str(ex)}), 500
 
 @app.route("/ai_fill_all_round2", methods=["POST"])
@@ -445,22 +2501,92 @@ def ai_fill_all_round2():
     campaign_goal = data.get("campaign_goal","")
     typed_answers = data.get("typedAnswers", {})
 
-    print(f"[SERVER] /ai_fill_all_round2 => campaign_goal='{campaign_goal}', typed_answers:\n{json.dumps(typed_answers, indent=2)}")
+    ai_log.info("ai_fill_all_round2", extra={"campaign_goal": clip(campaign_goal), "fields": len(typed_answers)})
+    log_payload(ai_log, "ai_fill_all_round2 typed answers", typed_answers)
 
     try:
         partial_data = {}
-        results = {}
-        for field_name, typed_value in typed_answers.items():
-            suggestions = ask_gpt_for_field_suggestions(campaign_goal, field_name, partial_data, typed_value)
-            results[field_name] = suggestions
+        results, errors = fan_out_field_suggestions(campaign_goal, typed_answers, partial_data)
 
-        print("[SERVER] /ai_fill_all_round2 => results:\n", json.dumps(results, indent=2))
-        return jsonify({"status":"ok","data":results})
+        log_payload(ai_log, "ai_fill_all_round2 results", results, errors=len(errors))
+        return jsonify({"status":"ok","data":results,"errors":errors})
     except Exception as ex:
-        print("Error in /ai_fill_all_round2:", ex)
+        ai_log.exception("ai_fill_all_round2 failed")
         return jsonify({"status":"error","message":str(ex)}), 500
 
-def ask_gpt_for_field_suggestions(campaign_goal, field_name, partial_data, typed_value=""):
+@app.route("/ai_cache_stats")
+def ai_cache_stats():
+    return jsonify(suggestion_cache.stats())
+
+def fan_out_field_suggestions(campaign_goal, fields_map, partial_data):
+    """
+    Runs ask_gpt_for_field_suggestions for every field concurrently, at most
+    AI_FILL_CONCURRENCY at a time, each bounded by AI_FILL_FIELD_TIMEOUT.
+    A failing or slow field does not fail the others: returns (results, errors)
+    where results maps every field to its (possibly empty) suggestions and
+    errors maps the fields that failed to a message.
+    """
+    results = {fld: [] for fld in fields_map}
+    errors = {}
+    if not fields_map:
+        return results, errors
+
+    limit = max(1, app.config["AI_FILL_CONCURRENCY"])
+    timeout = app.config["AI_FILL_FIELD_TIMEOUT"]
+    pool = ThreadPoolExecutor(max_workers=min(limit, len(fields_map)), thread_name_prefix="ai-fill")
+    futures = {
+        pool.submit(ask_gpt_for_field_suggestions, campaign_goal, fld, partial_data, typed or "", timeout): fld
+        for fld, typed in fields_map.items()
+    }
+    # Fields beyond the concurrency limit wait for a free slot, so the overall
+    # deadline allows one timeout per "wave" of calls.
+    waves = -(-len(futures) // limit)
+    done, not_done = wait(futures, timeout=timeout * waves)
+    for fut in done:
+        fld = futures[fut]
+        try:
+            results[fld] = fut.result()
+        except Exception as e:
+            ai_log.warning("AI suggestions failed: %s", e, extra={"field": fld})
+            errors[fld] = str(e)
+    for fut in not_done:
+        fut.cancel()
+        errors[futures[fut]] = f"Timed out after {timeout:g}s"
+    pool.shutdown(wait=False, cancel_futures=True)
+    return results, errors
+
+def _normalize_prompt_text(value):
+    return " ".join(str(value or "").split()).lower()
+
+def suggestion_cache_key(campaign_goal, field_name, partial_data, typed_value):
+    """
+    Cache key over the normalized prompt inputs: case and whitespace
+    differences in what the user typed do not cause a new GPT call.
+    """
+    parts = json.dumps([
+        _normalize_prompt_text(campaign_goal),
+        (field_name or "").strip(),
+        {k: _normalize_prompt_text(v) for k, v in (partial_data or {}).items()},
+        _normalize_prompt_text(typed_value),
+    ], sort_keys=True)
+    return hashlib.sha256(parts.encode("utf-8")).hexdigest()
+
+def ask_gpt_for_field_suggestions(campaign_goal, field_name, partial_data, typed_value="", timeout=None):
+    """
+    Memoized front of _ask_gpt_for_field_suggestions. Empty results (e.g.
+    invalid JSON from GPT) are not cached so the next call retries. timeout
+    defaults to AI_FILL_FIELD_TIMEOUT; the GPT call is never unbounded.
+    """
+    key = suggestion_cache_key(campaign_goal, field_name, partial_data, typed_value)
+    cached = suggestion_cache.get(key)
+    if cached is not None:
+        return cached
+    suggestions = _ask_gpt_for_field_suggestions(campaign_goal, field_name, partial_data, typed_value, timeout)
+    if suggestions:
+        suggestion_cache.set(key, suggestions)
+    return suggestions
+
+def _ask_gpt_for_field_suggestions(campaign_goal, field_name, partial_data, typed_value="", timeout=None):
     field_instructions = {
         "campaign_name": "Generate short, catchy campaign name ideas matching the goal.",
         "objective": "Generate short objective statements describing the campaign’s aims.",
@@ -494,22 +2620,26 @@ def ask_gpt_for_field_suggestions(campaign_goal, field_name, partial_data, typed
             "Return them in JSON under 'suggestions'."
         )
 
-    resp = client.chat.completions.create(
+    resp = llm_chat(
+        "suggestions",
         model="gpt-4",
         messages=[
             {"role": "system", "content": system_msg},
             {"role": "user", "content": user_text}
         ],
-        temperature=0.7
+        temperature=0.7,
+        # openai treats an explicit timeout=None as "wait forever".
+        timeout=timeout if timeout is not None else app.config["AI_FILL_FIELD_TIMEOUT"]
     )
     raw = resp.choices[0].message.content.strip()
-    print("[SERVER] GPT raw response:\n", raw)
+    log_payload(ai_log, "GPT raw response", raw, call_site="suggestions", field=field_name)
 
     try:
         parsed = json.loads(raw)
         return parsed.get("suggestions", [])
     except json.JSONDecodeError:
-        print("[SERVER] GPT returned invalid JSON => returning empty suggestions.\n", raw)
+        ai_log.warning("GPT returned invalid JSON; returning no suggestions",
+                       extra={"call_site": "suggestions", "field": field_name, "raw": clip(raw, app.config["LOG_PAYLOAD_MAX_CHARS"])})
         return []
 
 def get_additional_questions(round1_dict):
@@ -526,7 +2656,8 @@ def get_additional_questions(round1_dict):
         " ]}"
     )
     try:
-        r = client.chat.completions.create(
+        r = llm_chat(
+            "round2_questions",
             model="gpt-4",
             messages=[
                 {"role": "system", "content": system_msg},
@@ -535,11 +2666,11 @@ def get_additional_questions(round1_dict):
             temperature=0.7
         )
         return json.loads(r.choices[0].message.content.strip())
-    except Exception as e:
-        print("Error generating second round questions:", e)
+    except Exception:
+        ai_log.exception("Generating round 2 questions failed")
         return {"questions":[]}
 
-def generate_campaign_plan(round1_dict, round2_dict):
+def campaign_plan_messages(round1_dict, round2_dict):
     system_msg = (
         "You are an expert campaign strategist for a non-profit. "
         "Produce a final plan in Markdown from Round 1 & 2 data. Don't mention you're AI."
@@ -549,19 +2680,190 @@ def generate_campaign_plan(round1_dict, round2_dict):
         f"Round 2 data:\n{json.dumps(round2_dict, indent=2)}\n"
         "Generate final plan in Markdown with styled sections."
     )
+    return [
+        {"role":"system","content":system_msg},
+        {"role":"user","content":user_msg}
+    ]
+
+def stream_campaign_plan(round1_dict, round2_dict):
+    """
+    Yields the plan text piece by piece as the completion streams in.
+    Errors propagate to the caller.
+    """
+    stream = llm_chat(
+        "plan",
+        model="gpt-4",
+        messages=campaign_plan_messages(round1_dict, round2_dict),
+        temperature=0.7,
+        stream=True
+    )
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            yield delta
+
+###############################################
+# MATERIALS STORAGE (content-addressed)
+###############################################
+def material_path(sha256):
+    """
+    Storage path for a content hash, fanned out over two directory levels.
+    """
+    return os.path.join(app.config["MATERIALS_FOLDER"], sha256[:2], sha256[2:4], sha256)
+
+def stream_to_store(stream):
+    """
+    Copies a binary stream to a temp file in chunks, hashing as it goes.
+    Returns (sha256, size, temp_path); nothing is buffered whole in memory.
+    """
+    tmp_dir = os.path.join(app.config["MATERIALS_FOLDER"], "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+    digest = hashlib.sha256()
+    size = 0
+    chunk_size = app.config["UPLOAD_CHUNK_SIZE"]
     try:
-        r = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role":"system","content":system_msg},
-                {"role":"user","content":user_msg}
-            ],
-            temperature=0.7
-        )
-        return r.choices[0].message.content.strip()
-    except Exception as e:
-        print("Error generating final campaign plan:", e)
-        return "Error generating final campaign plan."
+        with open(tmp_path, "wb") as out:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return digest.hexdigest(), size, tmp_path
+
+def store_material(campaign_id, filename, stream):
+    """
+    Stores an upload for a campaign. Identical content is kept on disk once;
+    the campaign gets a CampaignMaterial reference and the Material's
+    ref_count is bumped. Re-uploading the same content to the same campaign
+    is a no-op. The file is moved into place before the reference commits,
+    while the rows are locked (see collect_orphan_materials), so a committed
+    reference always has its file. Commits. Returns (material, created_link).
+    """
+    sha, size, tmp_path = stream_to_store(stream)
+    try:
+        conn = db.session.connection()
+        conn.execute(insert_ignore(Material, ["sha256"]),
+                     {"sha256": sha, "size": size, "ref_count": 0,
+                      "created_at": datetime.datetime.utcnow()})
+        material = Material.query.filter_by(sha256=sha).one()
+        res = conn.execute(insert_ignore(CampaignMaterial, ["campaign_id", "material_id"]),
+                           {"campaign_id": campaign_id, "material_id": material.id,
+                            "filename": filename, "created_at": datetime.datetime.utcnow()})
+        created = bool(res.rowcount)
+        if created:
+            Material.query.filter_by(id=material.id).update(
+                {"ref_count": Material.ref_count + 1}, synchronize_session=False)
+
+        # Same sha256, same bytes: replacing an existing file is harmless, and
+        # re-placing it covers a collector that removed it just before.
+        path = material_path(sha)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return material, created
+
+def release_campaign_materials(campaign_id):
+    """
+    Drops all of a campaign's material references and decrements the
+    ref_counts. Caller commits, then runs collect_orphan_materials().
+    """
+    counts = dict(db.session.query(CampaignMaterial.material_id, db.func.count(CampaignMaterial.id))
+                  .filter_by(campaign_id=campaign_id)
+                  .group_by(CampaignMaterial.material_id))
+    if not counts:
+        return 0
+    CampaignMaterial.query.filter_by(campaign_id=campaign_id).delete(synchronize_session=False)
+    t = Material.__table__
+    db.session.connection().execute(
+        t.update().where(t.c.id == db.bindparam("b_id"))
+        .values(ref_count=t.c.ref_count - db.bindparam("b_n")),
+        [{"b_id": mid, "b_n": n} for mid, n in counts.items()])
+    return len(counts)
+
+def collect_orphan_materials():
+    """
+    Deletes Material rows nobody references any more, and their files.
+    Each delete is guarded on ref_count <= 0 so a concurrent re-upload that
+    took a new reference keeps the file, and the file is removed before the
+    delete commits, while the row is still locked against store_material.
+    Returns the number of files removed.
+    """
+    removed = 0
+    orphans = db.session.query(Material.id, Material.sha256).filter(Material.ref_count <= 0).all()
+    for mid, sha in orphans:
+        res = Material.query.filter(Material.id == mid, Material.ref_count <= 0).delete(
+            synchronize_session=False)
+        if res:
+            try:
+                os.remove(material_path(sha))
+                removed += 1
+            except FileNotFoundError:
+                pass
+            except OSError:
+                db.session.rollback()
+                raise
+        db.session.commit()
+    return removed
+
+def campaign_materials(campaign_id):
+    """
+    A campaign's materials as [{"filename", "sha256", "size"}], oldest first.
+    """
+    rows = (db.session.query(CampaignMaterial.filename, Material.sha256, Material.size)
+            .join(Material, Material.id == CampaignMaterial.material_id)
+            .filter(CampaignMaterial.campaign_id == campaign_id)
+            .order_by(CampaignMaterial.id))
+    return [{"filename": f, "sha256": sha, "size": size} for f, sha, size in rows]
+
+def migrate_materials_json():
+    """
+    One-off migration: moves files listed in the legacy materials_json blobs
+    into the content-addressed store and clears the blobs. Files that no
+    longer exist are skipped; originals are removed once every campaign has
+    been migrated, since overwritten same-name uploads could be shared.
+    Returns the number of campaigns migrated.
+    """
+    migrated = 0
+    originals = set()
+    legacy = (Campaign.query
+              .options(db.undefer_group("materials"))
+              .filter(Campaign.materials_json.notin_(["", '{"files": []}']))
+              .all())
+    for c in legacy:
+        try:
+            files = json.loads(c.materials_json).get("files", [])
+        except (ValueError, AttributeError):
+            files = []
+        for f in files:
+            path = f.get("path")
+            if not path or not os.path.isfile(path):
+                continue
+            with open(path, "rb") as fh:
+                store_material(c.id, f.get("filename") or os.path.basename(path), fh)
+            originals.add(path)
+        c.materials_json = json.dumps({"files": []})
+        db.session.commit()
+        migrated += 1
+    for path in originals:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    return migrated
 
 @app.route("/upload_materials/<campaign_id>", methods=["GET","POST"])
 def upload_materials(campaign_id):
@@ -572,33 +2874,63 @@ def upload_materials(campaign_id):
             fls = request.files.getlist("materials")
             for f in fls:
                 if f.filename:
-                    fname = secure_filename(f.filename)
-                    path = os.path.join(app.config["UPLOAD_FOLDER"], fname)
-                    f.save(path)
-                    file_list.append({"filename": fname, "path": path})
-
-        existing = json.loads(c.materials_json)
-        existing["files"].extend(file_list)
-        c.materials_json = json.dumps(existing)
-        db.session.commit()
-
-        email_prompts = generate_prompts(file_list, prompt_type="email", count=50)
-        tweet_prompts = generate_prompts(file_list, prompt_type="tweet", count=50)
-
-        c.prompts_emails = json.dumps(email_prompts)
-        c.prompts_tweets = json.dumps(tweet_prompts)
-        db.session.commit()
+                    fname = secure_filename(f.filename) or "upload"
+                    material, _ = store_material(c.id, fname, f.stream)
+                    file_list.append({"filename": fname, "sha256": material.sha256})
 
-        flash("Materials uploaded + prompts generated!", "success")
+        if submit_campaign_job(c, "prompts", job_generate_prompts, file_list):
+            flash("Materials uploaded! Email and tweet prompts are being generated.", "success")
+        else:
+            flash("Materials uploaded. Another job is still running; upload again once it finishes "
+                  "to generate prompts.", "warning")
         return redirect(url_for("final_campaign_details", campaign_id=c.id))
 
-    mat_info = json.loads(c.materials_json)
-    return render_template("combined.html",
-                           page="upload_materials",
+    return render_template("upload_materials.html",
                            campaign=c,
-                           materials=mat_info.get("files", []))
+                           materials=campaign_materials(c.id))
+
+def job_generate_prompts(c, file_list):
+    """
+    Background job behind upload_materials: generates 50 email and 50 tweet
+    prompts as PROMPT_CHUNK_SIZE-sized GPT calls, all running concurrently.
+    Each finished chunk is merged (deduplicated) into prompts_emails /
+    prompts_tweets and committed, so the details page fills in as it goes.
+    """
+    columns = {"email": "prompts_emails", "tweet": "prompts_tweets"}
+    count = 50
+    chunk = max(1, app.config["PROMPT_CHUNK_SIZE"])
+    parts = -(-count // chunk)
+    merged = {ptype: [] for ptype in columns}
+    seen = {ptype: set() for ptype in columns}
+    for col in columns.values():
+        setattr(c, col, json.dumps([]))
+    db.session.commit()
 
-def generate_prompts(file_list, prompt_type="email", count=50):
+    pool = ThreadPoolExecutor(max_workers=max(1, app.config["PROMPT_CONCURRENCY"]),
+                              thread_name_prefix="prompts")
+    try:
+        futures = {}
+        for ptype in columns:
+            for i in range(parts):
+                n = min(chunk, count - i * chunk)
+                fut = pool.submit(generate_prompts, file_list, ptype, n, (i + 1, parts))
+                futures[fut] = ptype
+        for fut in as_completed(futures):
+            ptype = futures[fut]
+            added = False
+            for prompt in fut.result():
+                key = _normalize_prompt_text(prompt)
+                if key and key not in seen[ptype]:
+                    seen[ptype].add(key)
+                    merged[ptype].append(prompt)
+                    added = True
+            if added:
+                setattr(c, columns[ptype], json.dumps(merged[ptype]))
+                db.session.commit()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def generate_prompts(file_list, prompt_type="email", count=50, part=None):
     filenames_text = ", ".join(f["filename"] for f in file_list)
     system_msg = f"You are a creative copywriter generating {prompt_type} ideas for a nonprofit campaign."
     user_msg = (
@@ -606,8 +2938,12 @@ def generate_prompts(file_list, prompt_type="email", count=50):
         f"Generate {count} short prompts or hooks for {prompt_type} messages.\n"
         "Return JSON like { \"prompts\": [...] }"
     )
+    if part:
+        # Parallel batches see the same materials; nudge each toward a different angle.
+        user_msg += f"\nThis is batch {part[0]} of {part[1]}; take a distinct angle from the other batches."
     try:
-        r = client.chat.completions.create(
+        r = llm_chat(
+            "prompts",
             model="gpt-4",
             messages=[
                 {"role":"system","content":system_msg},
@@ -620,21 +2956,22 @@ def generate_prompts(file_list, prompt_type="email", count=50):
             parsed = json.loads(raw)
             return parsed.get("prompts", [])
         except json.JSONDecodeError:
-            print("[SERVER] GPT returned invalid JSON for prompts => returning [].\n", raw)
+            ai_log.warning("GPT returned invalid JSON; returning no prompts",
+                           extra={"call_site": "prompts", "raw": clip(raw, app.config["LOG_PAYLOAD_MAX_CHARS"])})
             return []
-    except Exception as e:
-        print("Error generating prompts:", e)
+    except Exception:
+        ai_log.exception("Generating prompts failed", extra={"prompt_type": prompt_type})
         return []
 
 def send_tweet(prompt_text):
-    print(f"Tweeting: {prompt_text} + [DocuSign Link] ...")
+    twitter_log.info("Tweeting (stub)", extra={"text": clip(prompt_text)})
 
 ###################################################
 # Separated generate emails/tweets
 ###################################################
 @app.route("/ai_generate_emails/<campaign_id>", methods=["POST"])
 def ai_generate_emails(campaign_id):
-    c = Campaign.query.get_or_404(campaign_id)
+    c = Campaign.query.options(db.undefer_group("content")).get_or_404(campaign_id)
     r1_dict = {}
     if c.round1_data:
         try:
@@ -668,7 +3005,8 @@ def ai_generate_emails(campaign_id):
     )
 
     try:
-        resp = client.chat.completions.create(
+        resp = llm_chat(
+            "emails",
             model="gpt-4",
             messages=[
                 {"role": "system", "content": system_msg},
@@ -681,7 +3019,8 @@ def ai_generate_emails(campaign_id):
         try:
             parsed = json.loads(raw)
         except:
-            print("[SERVER] /ai_generate_emails => GPT returned invalid JSON, raw =\n", raw)
+            ai_log.warning("GPT returned invalid JSON; no emails generated",
+                           extra={"call_site": "emails", "campaign_id": c.id, "raw": clip(raw, app.config["LOG_PAYLOAD_MAX_CHARS"])})
             parsed = {"emails": []}
 
         emails = parsed.get("emails", [])
@@ -696,7 +3035,7 @@ def ai_generate_emails(campaign_id):
 
 @app.route("/ai_generate_tweets/<campaign_id>", methods=["POST"])
 def ai_generate_tweets(campaign_id):
-    c = Campaign.query.get_or_404(campaign_id)
+    c = Campaign.query.options(db.undefer_group("content")).get_or_404(campaign_id)
     r1_dict = {}
     if c.round1_data:
         try:
@@ -730,7 +3069,8 @@ def ai_generate_tweets(campaign_id):
     )
 
     try:
-        resp = client.chat.completions.create(
+        resp = llm_chat(
+            "tweets",
             model="gpt-4",
             messages=[
                 {"role": "system", "content": system_msg},
@@ -743,7 +3083,8 @@ def ai_generate_tweets(campaign_id):
         try:
             parsed = json.loads(raw)
         except:
-            print("[SERVER] /ai_generate_tweets => GPT returned invalid JSON, raw =\n", raw)
+            ai_log.warning("GPT returned invalid JSON; no tweets generated",
+                           extra={"call_site": "tweets", "campaign_id": c.id, "raw": clip(raw, app.config["LOG_PAYLOAD_MAX_CHARS"])})
             parsed = {"tweets": []}
 
         tweets = parsed.get("tweets", [])
@@ -764,39 +3105,366 @@ def post_tweet(campaign_id):
         flash("No tweet text provided.", "danger")
         return redirect(url_for("final_campaign_details", campaign_id=c.id))
 
-    twconfigs = TwitterBotConfig.query.all()
-    if not twconfigs:
+    if not tweet_scheduler.load_accounts():
         flash("No Twitter config found. Go to Settings to add your Twitter credentials.", "danger")
         return redirect(url_for("final_campaign_details", campaign_id=c.id))
 
-    tw = twconfigs[0]
-    try:
-        creds = json.loads(tw.credentials_json)
-    except:
-        flash("Invalid Twitter credentials JSON in DB.", "danger")
+    account = tweet_scheduler.next_account()
+    if account is None:
+        schedule_tweets(c.id, [tweet_text])
+        flash("All Twitter accounts are rate-limited right now; the tweet was queued.", "success")
         return redirect(url_for("final_campaign_details", campaign_id=c.id))
 
     try:
-        API_KEY = creds.get("API_KEY","")
-        API_SECRET_KEY = creds.get("API_SECRET_KEY","")
-        ACCESS_TOKEN = creds.get("ACCESS_TOKEN","")
-        ACCESS_TOKEN_SECRET = creds.get("ACCESS_TOKEN_SECRET","")
-
-        auth = OAuth1(API_KEY, API_SECRET_KEY, ACCESS_TOKEN, ACCESS_TOKEN_SECRET)
-        url = "https://api.twitter.com/2/tweets"
-        payload = {"text": tweet_text}
-        response = requests.post(url, json=payload, auth=auth)
-
+        response = account.post(tweet_text)
         if response.status_code == 201:
-            flash("Tweet posted successfully!", "success")
+            flash(f"Tweet posted successfully from {account.name}!", "success")
+        elif response.status_code == 429:
+            schedule_tweets(c.id, [tweet_text])
+            flash(f"{account.name} is rate-limited; the tweet was queued.", "success")
         else:
             flash(f"Failed to post tweet. Status code: {response.status_code}", "danger")
-            flash(f"Response: {response.json()}", "danger")
+            flash(f"Response: {response.text[:500]}", "danger")
     except Exception as ex:
         flash(f"Error calling Twitter API: {ex}", "danger")
 
     return redirect(url_for("final_campaign_details", campaign_id=c.id))
 
+###################################################
+# TWEET SCHEDULER
+###################################################
+class TwitterAccount:
+    """
+    One TwitterBotConfig with a persistent OAuth1 requests.Session and the
+    rate-limit state reported by the API (x-rate-limit-remaining/-reset,
+    Retry-After on 429). Safe to share between threads.
+    """
+    def __init__(self, config_id, name, creds):
+        self.config_id = config_id
+        self.name = name
+        import requests
+        from requests_oauthlib import OAuth1
+        self.session = requests.Session()
+        self.session.auth = OAuth1(creds.get("API_KEY",""), creds.get("API_SECRET_KEY",""),
+                                   creds.get("ACCESS_TOKEN",""), creds.get("ACCESS_TOKEN_SECRET",""))
+        self.remaining = None
+        self.reset_at = 0.0
+        self.blocked_until = 0.0
+        self.strikes = 0
+        self._lock = threading.Lock()
+
+    def wait_time(self):
+        """
+        Seconds until this account may post again (0 if it can post now).
+        """
+        now = time.time()
+        until = self.blocked_until
+        if self.remaining == 0:
+            until = max(until, self.reset_at)
+        return max(0.0, until - now)
+
+    def post(self, text):
+        with self._lock:
+            resp = self.session.post(app.config["TWITTER_API_URL"], json={"text": text},
+                                     timeout=app.config["TWITTER_TIMEOUT"])
+            self._update_limits(resp)
+        return resp
+
+    def _update_limits(self, resp):
+        h = resp.headers
+        now = time.time()
+        try:
+            if h.get("x-rate-limit-remaining") is not None:
+                self.remaining = int(h["x-rate-limit-remaining"])
+            if h.get("x-rate-limit-reset") is not None:
+                self.reset_at = float(h["x-rate-limit-reset"])
+        except ValueError:
+            pass
+        if resp.status_code != 429:
+            self.strikes = 0
+            return
+        self.strikes += 1
+        if self.reset_at > now:
+            self.blocked_until = self.reset_at
+        elif h.get("retry-after", "").isdigit():
+            self.blocked_until = now + int(h["retry-after"])
+        else:
+            # No usable hint: exponential backoff with jitter, capped at 15 minutes.
+            self.blocked_until = now + min(900, 5 * 2 ** self.strikes) * random.uniform(0.8, 1.2)
+
+def schedule_tweets(campaign_id, texts, interval_seconds=0):
+    """
+    Queues texts for the campaign, interval_seconds apart, skipping texts the
+    campaign already has queued or posted. Commits and wakes the scheduler.
+    Returns the number of tweets queued.
+    """
+    existing = {text for text, in db.session.query(ScheduledTweet.text)
+                .filter(ScheduledTweet.campaign_id == campaign_id,
+                        ScheduledTweet.status != "failed")}
+    now = datetime.datetime.utcnow()
+    rows = []
+    for text in texts:
+        text = (text or "").strip()
+        if not text or text in existing:
+            continue
+        existing.add(text)
+        rows.append({"campaign_id": campaign_id, "text": text, "status": "queued",
+                     "not_before": now + datetime.timedelta(seconds=interval_seconds * len(rows)),
+                     "attempts": 0, "created_at": now})
+    if rows:
+        db.session.execute(db.insert(ScheduledTweet), rows)
+    db.session.commit()
+    if rows:
+        tweet_scheduler.wake()
+    return len(rows)
+
+class TweetScheduler:
+    """
+    Posts queued ScheduledTweets in the background, spreading them round-robin
+    over every TwitterBotConfig account that is not currently rate-limited.
+    When all accounts are limited it sleeps until the earliest reset. A 429
+    puts the tweet back in the queue for another account; network errors and
+    5xx responses are retried with backoff up to TWEET_MAX_RETRIES; other
+    errors fail the tweet. Tweets are claimed with a guarded UPDATE, so
+    several processes can run a scheduler against the same database; a
+    claim older than TWEET_CLAIM_TIMEOUT is requeued by the next pass.
+    """
+    def __init__(self, app):
+        self.app = app
+        self.accounts = {}
+        self._rr = 0
+        self._thread = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self.posted = 0
+        self.failed = 0
+        self.rate_limited = 0
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            t = threading.Thread(target=self._run, name="tweet-scheduler", daemon=True)
+            t.start()
+            self._thread = t
+
+    def start(self):
+        self._ensure_started()
+
+    def wake(self):
+        self._ensure_started()
+        self._wake.set()
+
+    def load_accounts(self):
+        """
+        Syncs the account pool with TwitterBotConfig, keeping the existing
+        session and rate-limit state of unchanged accounts.
+        """
+        pool = {}
+        for cfg in TwitterBotConfig.query.order_by(TwitterBotConfig.id):
+            current = self.accounts.get(cfg.id)
+            if current is not None and current[0] == cfg.credentials_json:
+                pool[cfg.id] = current
+                continue
+            try:
+                creds = json.loads(cfg.credentials_json)
+            except (TypeError, ValueError):
+                twitter_log.warning("Skipping Twitter config with invalid credentials JSON", extra={"config_id": cfg.id})
+                continue
+            pool[cfg.id] = (cfg.credentials_json, TwitterAccount(cfg.id, cfg.name, creds))
+        self.accounts = pool
+        return [acct for _, acct in pool.values()]
+
+    def next_account(self):
+        """
+        Next account in round-robin order that can post now, or None.
+        """
+        with self._lock:
+            accounts = [acct for _, acct in self.accounts.values()]
+            for i in range(len(accounts)):
+                acct = accounts[(self._rr + i) % len(accounts)]
+                if acct.wait_time() == 0:
+                    self._rr = (self._rr + i + 1) % len(accounts)
+                    return acct
+        return None
+
+    def run_once(self, batch_size=50):
+        """
+        Posts the tweets that are due. Returns how many seconds to sleep before
+        the next pass (0 if there may be more due right away).
+        """
+        accounts = self.load_accounts()
+        idle = self.app.config["TWEET_POLL_INTERVAL"]
+        if not accounts:
+            return idle
+        requeue_lapsed_tweet_claims()
+        now = datetime.datetime.utcnow()
+        due = [tid for tid, in db.session.query(ScheduledTweet.id)
+               .filter(ScheduledTweet.status == "queued", ScheduledTweet.not_before <= now)
+               .order_by(ScheduledTweet.not_before, ScheduledTweet.id)
+               .limit(batch_size)]
+        if not due:
+            nxt = (db.session.query(db.func.min(ScheduledTweet.not_before))
+                   .filter(ScheduledTweet.status == "queued").scalar())
+            return min(idle, (nxt - now).total_seconds()) if nxt else idle
+
+        for tweet_id in due:
+            account = self.next_account()
+            if account is None:
+                return max(0.05, min(acct.wait_time() for acct in accounts))
+            claimed = (ScheduledTweet.query
+                       .filter_by(id=tweet_id, status="queued")
+                       .update({"status": "posting", "claimed_at": datetime.datetime.utcnow()},
+                               synchronize_session=False))
+            db.session.commit()
+            if claimed:
+                self._post(db.session.get(ScheduledTweet, tweet_id), account)
+        return 0
+
+    def _post(self, tweet, account):
+        import requests
+        try:
+            resp = account.post(tweet.text)
+        except requests.RequestException as e:
+            self._retry_later(tweet, str(e))
+            return
+        if resp.status_code in (200, 201):
+            try:
+                tweet.tweet_id = str((resp.json().get("data") or {}).get("id") or "") or None
+            except ValueError:
+                pass
+            tweet.status = "posted"
+            tweet.account_id = account.config_id
+            tweet.posted_at = datetime.datetime.utcnow()
+            tweet.last_error = None
+            self.posted += 1
+        elif resp.status_code == 429:
+            self.rate_limited += 1
+            tweet.status = "queued"
+            tweet.last_error = f"Rate-limited on {account.name}"
+        elif resp.status_code >= 500:
+            self._retry_later(tweet, f"HTTP {resp.status_code}: {resp.text[:500]}")
+            return
+        else:
+            tweet.status = "failed"
+            tweet.last_error = f"HTTP {resp.status_code}: {resp.text[:500]}"
+            self.failed += 1
+        db.session.commit()
+
+    def _retry_later(self, tweet, error):
+        tweet.attempts += 1
+        tweet.last_error = error
+        if tweet.attempts > self.app.config["TWEET_MAX_RETRIES"]:
+            tweet.status = "failed"
+            self.failed += 1
+        else:
+            tweet.status = "queued"
+            tweet.not_before = (datetime.datetime.utcnow()
+                                + datetime.timedelta(seconds=2 ** tweet.attempts))
+        db.session.commit()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.clear()
+            with self.app.app_context():
+                try:
+                    delay = self.run_once()
+                except Exception:
+                    db.session.rollback()
+                    twitter_log.exception("Tweet scheduler pass failed")
+                    delay = self.app.config["TWEET_POLL_INTERVAL"]
+            if delay:
+                self._wake.wait(delay)
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def stats(self):
+        return {
+            "accounts": [{"id": acct.config_id, "name": acct.name, "remaining": acct.remaining,
+                          "wait_seconds": round(acct.wait_time(), 1)}
+                         for _, acct in self.accounts.values()],
+            "posted": self.posted,
+            "failed": self.failed,
+            "rate_limited": self.rate_limited,
+        }
+
+tweet_scheduler = TweetScheduler(app)
+atexit.register(tweet_scheduler.stop)
+
+def requeue_lapsed_tweet_claims():
+    """
+    Puts tweets back in the queue whose scheduler died while posting them:
+    those claimed more than TWEET_CLAIM_TIMEOUT ago, or before claimed_at
+    existed. Returns how many were requeued.
+    """
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(seconds=app.config["TWEET_CLAIM_TIMEOUT"])
+    lapsed = db.and_(ScheduledTweet.status == "posting",
+                     db.or_(ScheduledTweet.claimed_at.is_(None), ScheduledTweet.claimed_at < cutoff))
+    # Checked with a read first, so an idle pass never takes the write lock.
+    if db.session.query(ScheduledTweet.id).filter(lapsed).first() is None:
+        return 0
+    n = (ScheduledTweet.query.filter(lapsed)
+         .update({"status": "queued", "claimed_at": None}, synchronize_session=False))
+    db.session.commit()
+    return n
+
+@app.before_request
+def _start_tweet_scheduler():
+    # Started from the first request rather than at import so CLI commands
+    # never post, and the thread lives in the (post-fork) worker process.
+    if app.config["TWEET_SCHEDULER_AUTOSTART"]:
+        tweet_scheduler.start()
+
+def tweet_queue_counts(campaign_id):
+    rows = (db.session.query(ScheduledTweet.status, db.func.count(ScheduledTweet.id))
+            .filter_by(campaign_id=campaign_id)
+            .group_by(ScheduledTweet.status))
+    counts = {"queued": 0, "posting": 0, "posted": 0, "failed": 0}
+    counts.update(dict(rows))
+    return counts
+
+@app.route("/schedule_tweets/<campaign_id>", methods=["POST"])
+def schedule_campaign_tweets(campaign_id):
+    c = Campaign.query.options(db.undefer_group("prompts")).get_or_404(campaign_id)
+    tweets = json.loads(c.prompts_tweets) if c.prompts_tweets else []
+    try:
+        interval = max(0, int(float(request.form.get("interval_minutes") or 0) * 60))
+    except ValueError:
+        interval = 0
+    n = schedule_tweets(c.id, tweets, interval)
+    if n:
+        flash(f"Queued {n} tweet(s) for posting.", "success")
+    else:
+        flash("No new tweets to queue.", "danger")
+    return redirect(url_for("final_campaign_details", campaign_id=c.id))
+
+@app.route("/tweet_queue/<campaign_id>")
+def tweet_queue(campaign_id):
+    c = Campaign.query.get_or_404(campaign_id)
+    failed = (ScheduledTweet.query.filter_by(campaign_id=c.id, status="failed")
+              .order_by(ScheduledTweet.id.desc()).limit(20))
+    return jsonify({
+        "counts": tweet_queue_counts(c.id),
+        "failed": [{"id": t.id, "text": t.text, "error": t.last_error} for t in failed],
+        "scheduler": tweet_scheduler.stats(),
+    })
+
+@app.cli.command("post-scheduled-tweets")
+def post_scheduled_tweets_command():
+    """Post every queued tweet in the foreground, waiting out rate limits."""
+    while ScheduledTweet.query.filter_by(status="queued").first():
+        delay = tweet_scheduler.run_once()
+        if delay:
+            time.sleep(delay)
+    print(json.dumps(tweet_scheduler.stats()))
+
 @app.route("/send_individual_email/<campaign_id>", methods=["POST"])
 def send_individual_email(campaign_id):
     c = Campaign.query.get_or_404(campaign_id)
@@ -810,22 +3478,17 @@ def send_individual_email(campaign_id):
         flash("No EmailBotConfig found; go to Settings to configure Email.", "danger")
         return redirect(url_for("final_campaign_details", campaign_id=c.id))
 
-    recipients = json.loads(c.email_list) if c.email_list else []
-    if not recipients:
+    has_recipients = db.session.query(RecipientStatus.id).filter_by(campaign_id=c.id).first()
+    if not has_recipients:
         flash("No recipients found. Please set up the email list first.", "danger")
         return redirect(url_for("final_campaign_details", campaign_id=c.id))
 
     subject = f"Newsletter Snippet: {c.name}"
     body_text = snippet
 
-    try:
-        if config.method == "local":
-            send_via_local_noauth(recipients, subject, body_text, config)
-        else:
-            send_via_smtp(recipients, subject, body_text, config)
-        flash(f"Sent individual email snippet to {len(recipients)} recipients!", "success")
-    except Exception as e:
-        flash(f"Error sending email snippet: {e}", "danger")
+    job = create_mailing_job(c.id, "snippet", subject, body_text)
+    submit_mailing_job(job)
+    flash(f"Queued email snippet for {job.total} recipients (mailing #{job.id}).", "success")
 
     return redirect(url_for("final_campaign_details", campaign_id=c.id))
 
@@ -849,68 +3512,417 @@ def send_newsletter_emails(campaign_id):
         flash("No prompts_emails found; generate email prompts first.", "danger")
         return redirect(url_for("final_campaign_details", campaign_id=c.id))
 
-    recipients = json.loads(c.email_list) if c.email_list else []
-    if not recipients:
+    has_recipients = db.session.query(RecipientStatus.id).filter_by(campaign_id=c.id).first()
+    if not has_recipients:
         flash("No recipients found. Please set up the email list first.", "danger")
         return redirect(url_for("final_campaign_details", campaign_id=c.id))
 
     subject = f"Newsletter: {c.name}"
     body_text = "\n\n".join(emails_list)
 
-    try:
-        if config.method == "local":
-            send_via_local_noauth(recipients, subject, body_text, config)
-        else:
-            send_via_smtp(recipients, subject, body_text, config)
-        flash(f"Sent newsletter to {len(recipients)} recipients!", "success")
-    except Exception as e:
-        flash(f"Error sending emails: {e}", "danger")
+    job = create_mailing_job(c.id, "newsletter", subject, body_text)
+    submit_mailing_job(job)
+    flash(f"Queued newsletter for {job.total} recipients (mailing #{job.id}).", "success")
 
     return redirect(url_for("final_campaign_details", campaign_id=c.id))
 
-def send_via_local_noauth(recipients, subject, body_text, config):
-    host = config.smtp_host or "localhost"
-    # Use MailHog default port 1025
-    port = int(config.smtp_port or 1025)
-    from_addr = config.sender_email or "noreply@example.org"
+###################################################
+# EMAIL DELIVERY ENGINE
+###################################################
+class HostRateLimiter:
+    """
+    Token bucket limiting how many messages per second go to one SMTP host.
+    Shared by every delivery running in this process (see host_rate_limiter).
+    """
+    def __init__(self, rate_per_sec):
+        self.rate = rate_per_sec
+        self.tokens = max(1.0, rate_per_sec)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(max(1.0, self.rate), self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_for = (1 - self.tokens) / self.rate
+            time.sleep(wait_for)
+
+_host_limiters = {}
+_host_limiters_lock = threading.Lock()
+
+def host_rate_limiter(host, port, rate_per_sec):
+    key = (host, port)
+    with _host_limiters_lock:
+        limiter = _host_limiters.get(key)
+        if limiter is None or limiter.rate != rate_per_sec:
+            limiter = HostRateLimiter(rate_per_sec)
+            _host_limiters[key] = limiter
+        return limiter
+
+class SmtpDeliveryEngine:
+    """
+    Sends one message to many recipients over a pool of persistent SMTP
+    connections. Each of the `pool_size` worker threads keeps its own
+    connection open for the whole run, reconnects when the server drops it,
+    and retries a recipient up to `max_retries` times on transient errors.
+    Permanent rejections (5xx) are not retried, and once a worker exhausts
+    its retries trying to reconnect the remaining recipients fail fast. Sends are throttled per host
+    by a shared HostRateLimiter.
+
+    on_result(email, status, error) is called from worker threads for every
+    recipient with status "sent", "failed" (permanently rejected) or
+    "deferred" (transient error, worth retrying later). Setting the `cancel`
+    event stops the workers before their next recipient; recipients not yet
+    attempted get no on_result call.
+    """
+    def __init__(self, host, port, from_addr, user=None, password=None, starttls=False,
+                 pool_size=4, rate_per_sec=0, max_retries=2, timeout=30):
+        self.host = host
+        self.port = port
+        self.from_addr = from_addr
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.pool_size = max(1, pool_size)
+        self.limiter = host_rate_limiter(host, port, rate_per_sec)
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.last_connect_error = None
+        self._unreachable = threading.Event()
+
+    def _connect(self):
+        try:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        except (OSError, smtplib.SMTPException) as e:
+            self.last_connect_error = e
+            raise
+        if self.starttls:
+            server.starttls()
+        if self.user:
+            server.login(self.user, self.password)
+        return server
+
+    def _message_template(self, subject, body_text):
+        # Everything but the To: header is identical for all recipients,
+        # so the MIME body is serialized once.
+        msg = MIMEMultipart("alternative")
+        msg["Subject"] = subject
+        msg["From"] = self.from_addr
+        msg.attach(MIMEText(body_text, "plain"))
+        return msg.as_string()
+
+    @staticmethod
+    def _close(server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def _worker(self, work, message, results, on_result, cancel):
+        server = None
+        while cancel is None or not cancel.is_set():
+            try:
+                rcpt = work.get_nowait()
+            except queue.Empty:
+                break
+            status, error = "deferred", None
+            for attempt in range(self.max_retries + 1):
+                if self._unreachable.is_set():
+                    error = f"Mail server unreachable: {self.last_connect_error}"
+                    break
+                self.limiter.acquire()
+                try:
+                    if server is None:
+                        try:
+                            server = self._connect()
+                        except (OSError, smtplib.SMTPException):
+                            # Give up on the whole run once reconnecting keeps failing.
+                            if attempt == self.max_retries:
+                                self._unreachable.set()
+                            raise
+                    send_started = time.perf_counter()
+                    server.sendmail(self.from_addr, [rcpt], f"To: {rcpt}\n" + message)
+                    SMTP_SEND_SECONDS.observe(time.perf_counter() - send_started)
+                    status, error = "sent", None
+                    break
+                except smtplib.SMTPRecipientsRefused as e:
+                    refusal = e.recipients.get(rcpt)
+                    error = str(refusal or e)
+                    # 4xx RCPT replies (greylisting, mailbox busy) are transient.
+                    if not refusal or refusal[0] >= 500:
+                        status = "failed"
+                        break
+                except smtplib.SMTPResponseException as e:
+                    error = f"{e.smtp_code} {e.smtp_error!r}"
+                    if e.smtp_code >= 500:
+                        status = "failed"
+                        break
+                except (OSError, smtplib.SMTPException) as e:
+                    error = str(e) or e.__class__.__name__
+                    if server is not None:
+                        self._close(server)
+                    server = None
+                if attempt < self.max_retries:
+                    time.sleep(min(2 ** attempt * 0.5, 5))
+            SMTP_MESSAGES.labels(status).inc()
+            with results["lock"]:
+                if status == "sent":
+                    results["sent"] += 1
+                else:
+                    results["failed"][rcpt] = error
+            if on_result:
+                on_result(rcpt, status, error)
+        if server is not None:
+            self._close(server)
+
+    def deliver(self, recipients, subject, body_text, on_result=None, cancel=None):
+        """
+        Blocks until every recipient was attempted.
+        Returns {"sent": int, "failed": {email: error}}.
+        """
+        work = queue.Queue()
+        for r in recipients:
+            work.put(r)
+        results = {"sent": 0, "failed": {}, "lock": threading.Lock()}
+        message = self._message_template(subject, body_text)
+        workers = [
+            threading.Thread(target=self._worker, args=(work, message, results, on_result, cancel),
+                             name=f"smtp-{self.host}-{i}", daemon=True)
+            for i in range(min(self.pool_size, len(recipients)))
+        ]
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        return {"sent": results["sent"], "failed": results["failed"]}
+
+def smtp_engine_for_config(config):
+    """
+    Builds a delivery engine from the EmailBotConfig row.
+    method="local" talks to an unauthenticated local MTA (MailHog on 1025 by default).
+    """
+    opts = dict(
+        pool_size=app.config["SMTP_POOL_SIZE"],
+        rate_per_sec=app.config["SMTP_RATE_PER_HOST"],
+        max_retries=app.config["SMTP_MAX_RETRIES"],
+        timeout=app.config["SMTP_TIMEOUT"],
+    )
+    if config.method == "local":
+        return SmtpDeliveryEngine(
+            config.smtp_host or "localhost",
+            int(config.smtp_port or 1025),
+            config.sender_email or "noreply@example.org",
+            **opts
+        )
+    return SmtpDeliveryEngine(
+        config.smtp_host,
+        int(config.smtp_port),
+        config.sender_email or config.smtp_user,
+        user=config.smtp_user,
+        password=config.smtp_pass,
+        starttls=True,
+        **opts
+    )
 
-    try:
-        server = smtplib.SMTP(host, port)
-    except Exception as conn_err:
+def deliver_email(recipients, subject, body_text, config, on_result=None, cancel=None):
+    """
+    Sends the message to every recipient through the pooled engine.
+    Raises if no message could be delivered because the server was unreachable.
+    """
+    engine = smtp_engine_for_config(config)
+    result = engine.deliver(recipients, subject, body_text, on_result=on_result, cancel=cancel)
+    if result["sent"] == 0 and result["failed"] and engine.last_connect_error is not None:
         raise Exception(
-            f"Could not connect to local mail server at {host}:{port}. "
+            f"Could not connect to mail server at {engine.host}:{engine.port}. "
             "Either run a local MTA (MailHog/Postfix/Sendmail) or update your settings."
-        ) from conn_err
+        ) from engine.last_connect_error
+    return result
 
-    for r in recipients:
-        msg = MIMEMultipart("alternative")
-        msg["Subject"] = subject
-        msg["From"] = from_addr
-        msg["To"] = r
-        part = MIMEText(body_text, "plain")
-        msg.attach(part)
-        server.sendmail(from_addr, r, msg.as_string())
-    server.quit()
-
-def send_via_smtp(recipients, subject, body_text, config):
-    host = config.smtp_host
-    port = int(config.smtp_port)
-    user = config.smtp_user
-    pw = config.smtp_pass
-    from_addr = config.sender_email or user
-
-    server = smtplib.SMTP(host, port)
-    server.starttls()
-    server.login(user, pw)
-    for r in recipients:
-        msg = MIMEMultipart("alternative")
-        msg["Subject"] = subject
-        msg["From"] = from_addr
-        msg["To"] = r
-        part = MIMEText(body_text, "plain")
-        msg.attach(part)
-        server.sendmail(from_addr, r, msg.as_string())
-    server.quit()
+###################################################
+# MAILING JOBS (resumable, checkpointed)
+###################################################
+def create_mailing_job(campaign_id, kind, subject, body_text):
+    """
+    Creates a job and snapshots the campaign's recipients as pending rows
+    with a single INSERT ... SELECT.
+    """
+    job = MailingJob(campaign_id=campaign_id, kind=kind, subject=subject, body_text=body_text)
+    db.session.add(job)
+    db.session.flush()
+    src = (db.select(db.literal(job.id), RecipientStatus.email, db.literal("pending"))
+           .where(RecipientStatus.campaign_id == campaign_id)
+           .order_by(RecipientStatus.id))
+    db.session.execute(
+        db.insert(MailingRecipient).from_select(["job_id", "email", "state"], src)
+    )
+    job.total = MailingRecipient.query.filter_by(job_id=job.id).count()
+    db.session.commit()
+    return job
+
+def submit_mailing_job(job):
+    """
+    Queues the job under a lease. Returns False if a live worker holds it.
+    """
+    if not job_leases.claim(MailingJob, job.id, {"status": "queued", "error": None}):
+        return False
+    db.session.expire(job)
+    bulk_executor.submit(run_mailing_job, app, job.id)
+    return True
+
+class MailingCheckpointer:
+    """
+    Collects per-recipient results from the delivery workers and writes
+    them to MailingRecipient in bulk every MAILING_CHECKPOINT_EVERY results.
+    Each checkpoint is fenced on the job lease: once `owner` no longer holds
+    it (the lease lapsed and the job was reaped or resumed elsewhere), the
+    batch is dropped and `lost` is set so the delivery workers stop.
+    """
+    def __init__(self, flask_app, job_id, owner):
+        self.app = flask_app
+        self.job_id = job_id
+        self.owner = owner
+        self.lost = threading.Event()
+        self.every = flask_app.config["MAILING_CHECKPOINT_EVERY"]
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def record(self, email, status, error):
+        with self._lock:
+            self._pending.append({"b_job": self.job_id, "b_email": email,
+                                  "b_state": status, "b_error": error})
+            due = len(self._pending) >= self.every
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                rows, self._pending = self._pending, []
+            if not rows:
+                return
+            t = MailingRecipient.__table__
+            stmt = (t.update()
+                    .where(t.c.job_id == db.bindparam("b_job"), t.c.email == db.bindparam("b_email"))
+                    .values(state=db.bindparam("b_state"), last_error=db.bindparam("b_error"),
+                            attempts=t.c.attempts + 1))
+            with self.app.app_context():
+                # Locks the job row first, so the lease cannot change hands
+                # before this batch commits.
+                held = (MailingJob.query
+                        .filter(MailingJob.id == self.job_id, MailingJob.lease_owner == self.owner)
+                        .update({"lease_owner": self.owner}, synchronize_session=False))
+                if not held:
+                    db.session.rollback()
+                    self.lost.set()
+                    return
+                db.session.connection().execute(stmt, rows)
+                refresh_mailing_job_counts(db.session.get(MailingJob, self.job_id))
+                db.session.commit()
+
+def refresh_mailing_job_counts(job):
+    counts = dict(db.session.query(MailingRecipient.state, db.func.count(MailingRecipient.id))
+                  .filter_by(job_id=job.id)
+                  .group_by(MailingRecipient.state))
+    job.sent_count = counts.get("sent", 0)
+    job.failed_count = counts.get("failed", 0)
+    job.deferred_count = counts.get("deferred", 0)
+
+def run_mailing_job(flask_app, job_id):
+    """
+    Sends to every recipient of the job that is not yet 'sent'. Safe to call
+    again on an interrupted or partially failed job. The caller must hold
+    the job's lease (see submit_mailing_job).
+    """
+    with flask_app.app_context():
+        job = db.session.get(MailingJob, job_id)
+        if not job or job.lease_owner != job_leases.owner:
+            job_leases.forget(MailingJob, job_id)
+            return
+        config = db.session.get(EmailBotConfig, 1)
+        job.status = "running"
+        db.session.commit()
+
+        recipients = [r.email for r in
+                      db.session.query(MailingRecipient.email)
+                      .filter(MailingRecipient.job_id == job_id, MailingRecipient.state != "sent")
+                      .order_by(MailingRecipient.id)]
+        checkpointer = MailingCheckpointer(flask_app, job_id, job_leases.owner)
+        error = None
+        try:
+            if config is None:
+                raise Exception("No EmailBotConfig found; go to Settings to configure Email.")
+            if recipients:
+                deliver_email(recipients, job.subject, job.body_text, config,
+                              on_result=checkpointer.record, cancel=checkpointer.lost)
+        except Exception as e:
+            mail_log.exception("Mailing job failed", extra={"job_id": job_id})
+            error = str(e)
+        finally:
+            checkpointer.flush()
+        if checkpointer.lost.is_set():
+            # Another worker owns the job now; leave its row alone.
+            mail_log.warning("Mailing job lease lost, stopped sending", extra={"job_id": job_id})
+            job_leases.forget(MailingJob, job_id)
+            return
+
+        db.session.expire_all()
+        job = db.session.get(MailingJob, job_id)
+        refresh_mailing_job_counts(job)
+        job.finished_at = datetime.datetime.utcnow()
+        job_leases.release(MailingJob, job_id,
+                           {"status": "done" if error is None else "interrupted", "error": error})
+
+@app.route("/mailing_job/<int:job_id>")
+def mailing_job_status(job_id):
+    job = report_lapsed_job(MailingJob.query.get_or_404(job_id))
+    pending = job.total - job.sent_count - job.failed_count - job.deferred_count
+    return jsonify({
+        "id": job.id,
+        "campaign_id": job.campaign_id,
+        "kind": job.kind,
+        "status": job.status,
+        "total": job.total,
+        "sent": job.sent_count,
+        "failed": job.failed_count,
+        "deferred": job.deferred_count,
+        "pending": pending,
+        "error": job.error
+    })
+
+@app.route("/resume_mailing_job/<int:job_id>", methods=["POST"])
+def resume_mailing_job(job_id):
+    job = MailingJob.query.get_or_404(job_id)
+    if not submit_mailing_job(job):
+        flash(f"Mailing #{job.id} is already {job.status}.", "danger")
+    else:
+        flash(f"Resumed mailing #{job.id}; only recipients not yet sent will be retried.", "success")
+    return redirect(url_for("final_campaign_details", campaign_id=job.campaign_id))
+
+@app.cli.command("resume-mailings")
+def resume_mailings_command():
+    """Resume every interrupted or orphaned (lease lapsed) mailing job in this process."""
+    now = datetime.datetime.utcnow()
+    jobs = (MailingJob.query
+            .filter(db.or_(MailingJob.status == "interrupted",
+                           db.and_(MailingJob.status.in_(ACTIVE_JOB_STATES),
+                                   db.or_(MailingJob.lease_until.is_(None), MailingJob.lease_until < now))))
+            .order_by(MailingJob.id).all())
+    for job in jobs:
+        if not job_leases.claim(MailingJob, job.id, {"status": "queued", "error": None}):
+            continue
+        print(f"Resuming mailing #{job.id} ({job.total - job.sent_count} recipients left)...")
+        run_mailing_job(app, job.id)
 
 ###############################################
 # SETTINGS
@@ -919,12 +3931,12 @@ def send_via_smtp(recipients, subject, body_text, config):
 def settings():
     email_config = db.session.get(EmailBotConfig, 1)
     if not email_config:
+        # Only persisted when the email form is saved; GET never writes.
         email_config = EmailBotConfig(id=1, method="local")
-        db.session.add(email_config)
-        db.session.commit()
 
     if request.method == "POST":
         if "email_config_form" in request.form:
+            db.session.add(email_config)
             method = request.form.get("method","local")
             smtp_host = request.form.get("smtp_host","")
             # Default to 1025 for MailHog
@@ -970,8 +3982,7 @@ def settings():
             return redirect(url_for("settings"))
 
     all_twitters = TwitterBotConfig.query.all()
-    return render_template("combined.html",
-                           page="settings",
+    return render_template("settings.html",
                            config=email_config,
                            twitters=all_twitters)
 
@@ -1020,7 +4031,7 @@ def date_from_offset(offset_type, offset_val):
     return ""
 
 ###############################################################################
-# DOCUSIGN CODE (unchanged)
+# DOCUSIGN CODE
 ###############################################################################
 DOCUSIGN_INTEGRATION_KEY = "0d2c0571-XXXXXXXXXXXXX"
 DOCUSIGN_USER_ID = "a286ff7e-a682-XXXXXXXXXX"
@@ -1032,22 +4043,144 @@ BASE_PATH = "https://demo.docusign.net/restapi"
 OAUTH_HOST = "account-d.docusign.com"
 SCOPES = ["signature", "impersonation"]
 
-def generate_access_token():
+class ServiceTokenCache:
+    """
+    Access-token cache backed by a ServiceToken row, so all threads and
+    worker processes share one token. fetch() must return
+    (access_token, expires_in_seconds).
+
+    A token is served from memory while it has more than refresh_ahead
+    seconds left. Inside that window the current token is still returned
+    and one background refresh is started; only an expired or missing token
+    makes callers wait. Refreshes are single-flight: threads coalesce on a
+    lock, and processes on a lease in the row, so the auth host sees one
+    request per expiry no matter how many callers there are.
+    """
+    def __init__(self, app, name, fetch):
+        self.app = app
+        self.name = name
+        self.fetch = fetch
+        self.owner = uuid.uuid4().hex
+        self._token = None
+        self._expires_at = None
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+        self.refreshes = 0
+
+    def _seconds_left(self, now):
+        if not self._token or not self._expires_at:
+            return 0
+        return (self._expires_at - now).total_seconds()
+
+    def get(self):
+        now = datetime.datetime.utcnow()
+        left = self._seconds_left(now)
+        if left > self.app.config["DOCUSIGN_TOKEN_REFRESH_AHEAD"]:
+            return self._token
+        if left > 0:
+            if self._refreshing.acquire(blocking=False):
+                job_executor.submit(self._background_refresh)
+            return self._token
+        with self._lock:
+            if self._seconds_left(datetime.datetime.utcnow()) > 0:
+                return self._token
+            return self._refresh(wait=True)
+
+    def _background_refresh(self):
+        try:
+            with self.app.app_context(), self._lock:
+                self._refresh(wait=False)
+        except Exception:
+            docusign_log.exception("Background token refresh failed", extra={"token": self.name})
+        finally:
+            self._refreshing.release()
+
+    def _load_row(self):
+        db.session.expire_all()
+        row = db.session.get(ServiceToken, self.name)
+        if row and row.access_token and row.expires_at:
+            self._token, self._expires_at = row.access_token, row.expires_at
+        return row
+
+    def _refresh(self, wait):
+        """
+        Adopts a fresher token another worker stored, or takes the lease and
+        fetches a new one. If another worker holds the lease, waits for its
+        result (wait=True) or keeps the current token (wait=False).
+        """
+        ahead = datetime.timedelta(seconds=self.app.config["DOCUSIGN_TOKEN_REFRESH_AHEAD"])
+        lease = self.app.config["DOCUSIGN_TOKEN_LEASE"]
+        deadline = time.monotonic() + lease
+        db.session.execute(insert_ignore(ServiceToken, ["name"]), [{"name": self.name}])
+        db.session.commit()
+        while True:
+            now = datetime.datetime.utcnow()
+            self._load_row()
+            if self._token and self._expires_at - now > ahead:
+                return self._token
+            claimed = (ServiceToken.query
+                       .filter(ServiceToken.name == self.name,
+                               db.or_(ServiceToken.lease_until.is_(None),
+                                      ServiceToken.lease_until < now))
+                       .update({"lease_until": now + datetime.timedelta(seconds=lease),
+                                "lease_owner": self.owner}, synchronize_session=False))
+            db.session.commit()
+            if claimed:
+                return self._fetch_and_store()
+            if not wait or time.monotonic() > deadline:
+                return self._token if self._seconds_left(now) > 0 else None
+            time.sleep(0.25)
+
+    def _fetch_and_store(self):
+        try:
+            token, expires_in = self.fetch()
+        except Exception:
+            self._release_lease({})
+            raise
+        self.refreshes += 1
+        expires_at = datetime.datetime.utcnow() + datetime.timedelta(seconds=int(expires_in))
+        self._release_lease({"access_token": token, "expires_at": expires_at})
+        self._token, self._expires_at = token, expires_at
+        return token
+
+    def _release_lease(self, values):
+        values.update({"lease_until": None, "lease_owner": None})
+        (ServiceToken.query
+         .filter_by(name=self.name, lease_owner=self.owner)
+         .update(values, synchronize_session=False))
+        db.session.commit()
+
+    def invalidate(self):
+        """
+        Drops the token everywhere, e.g. after the API rejected it.
+        """
+        with self._lock:
+            self._token = self._expires_at = None
+            ServiceToken.query.filter_by(name=self.name).update(
+                {"access_token": None, "expires_at": None}, synchronize_session=False)
+            db.session.commit()
+
+def request_docusign_token():
     from docusign_esign import ApiClient
     api_client = ApiClient()
     api_client.set_base_path(BASE_PATH)
+    token_response = api_client.request_jwt_user_token(
+        client_id=DOCUSIGN_INTEGRATION_KEY,
+        user_id=DOCUSIGN_USER_ID,
+        private_key_bytes=RSA_PRIVATE_KEY.encode("utf-8"),
+        expires_in=3600,
+        scopes=SCOPES,
+        oauth_host_name=OAUTH_HOST
+    )
+    return token_response.access_token, int(getattr(token_response, "expires_in", None) or 3600)
+
+docusign_tokens = ServiceTokenCache(app, "docusign", request_docusign_token)
+
+def generate_access_token():
     try:
-        token_response = api_client.request_jwt_user_token(
-            client_id=DOCUSIGN_INTEGRATION_KEY,
-            user_id=DOCUSIGN_USER_ID,
-            private_key_bytes=RSA_PRIVATE_KEY.encode("utf-8"),
-            expires_in=3600,
-            scopes=SCOPES,
-            oauth_host_name=OAUTH_HOST
-        )
-        return token_response.access_token
-    except Exception as e:
-        print("Error generating access token:", e)
+        return docusign_tokens.get()
+    except Exception:
+        docusign_log.exception("Could not get a DocuSign access token")
         return None
 
 @app.route('/send_to_docusign', methods=['POST'])
@@ -1072,26 +4205,35 @@ def send_to_docusign():
 
     return jsonify({"status":"stub - must define ContractVersion model"}), 200
 
+###############################################
+# APP INIT
+###############################################
+def init_app():
+    """
+    Sets up logging and the template cache and binds the database to `app`.
+    Called once below, so `import app` yields a ready application for every
+    entry point (gunicorn app:app, flask --app app ...). All configuration
+    comes from the environment (see SETUP & CONFIG). It never touches the
+    schema: run init-db once per deploy, not per worker.
+    """
+    if "sqlalchemy" in app.extensions:
+        return app
+    configure_logging()
+    if app.config["TEMPLATE_BYTECODE_CACHE"]:
+        cache_dir = app.config["TEMPLATE_BYTECODE_CACHE_DIR"] or None
+        if cache_dir:
+            os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config["SQLALCHEMY_DATABASE_URI"])
+    db.init_app(app)
+    return app
+
+init_app()
+
 ###############################################
 # MAIN
 ###############################################
 if __name__ == "__main__":
     with app.app_context():
-        db.create_all()
-        # Use db.session.get() to avoid LegacyAPIWarning
-        row = db.session.get(EmailBotConfig, 1)
-        if not row:
-            # Default to method=local, pointing at MailHog on localhost:1025
-            default_config = EmailBotConfig(
-                id=1,
-                method="local",
-                smtp_host="localhost",
-                smtp_port="1025",
-                smtp_user="",
-                smtp_pass="",
-                sender_email="noreply@example.org"
-            )
-            db.session.add(default_config)
-            db.session.commit()
-
-    app.run(debug=True)
\ No newline at end of file
+        init_db()
+    app.run(debug=True)
@@ -0,0 +1,266 @@
+"""
+Local stand-ins for the external services the app talks to, so benchmarks
+never leave the machine:
+
+  FakeOpenAI - OpenAI-compatible /v1/chat/completions with configurable
+               latency and payload size (streaming supported)
+  SmtpSink   - minimal SMTP server that accepts and counts every message
+  FakeTwitter - POST /2/tweets with a per-account rate limit, answering with
+               the x-rate-limit-* headers and 429s the real API sends
+"""
+import json
+import random
+import re
+import socketserver
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeOpenAI:
+    """
+    Answers every chat completion with one JSON object holding `items`
+    entries under each key the app parses (suggestions, prompts, questions,
+    emails, tweets), after latency_ms +/- jitter_ms.
+    """
+    def __init__(self, latency_ms=300, jitter_ms=50, items=5, host="127.0.0.1", port=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.items = items
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def content(self):
+        n = self.items
+        return json.dumps({
+            "suggestions": [{"text": f"Suggestion {i}", "tier": tier, "explanation": "Benchmark payload."}
+                            for i, tier in zip(range(n), ["Conservative", "Realistic", "Ambitious"] * n)],
+            "prompts": [f"Prompt idea {i} {random.random():.6f}" for i in range(n)],
+            "questions": [{"label": f"Question {i}?", "type": "text", "field_name": f"question_{i}"}
+                          for i in range(n)],
+            "emails": [f"Email paragraph {i}." for i in range(n)],
+            "tweets": [f"Tweet {i} #impact" for i in range(n)],
+        })
+
+    def _sleep(self):
+        delay = max(0.0, self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+        time.sleep(delay)
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with fake._lock:
+                    fake.requests += 1
+                fake._sleep()
+                content = fake.content()
+                if body.get("stream"):
+                    self._stream(body, content)
+                    return
+                payload = json.dumps({
+                    "id": "chatcmpl-bench",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "gpt-4"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": content}}],
+                    "usage": {"prompt_tokens": 100, "completion_tokens": len(content) // 4,
+                              "total_tokens": 100 + len(content) // 4},
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _stream(self, body, content):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for i in range(0, len(content), 40):
+                    chunk = {"id": "chatcmpl-bench", "object": "chat.completion.chunk",
+                             "created": int(time.time()), "model": body.get("model", "gpt-4"),
+                             "choices": [{"index": 0, "delta": {"content": content[i:i + 40]},
+                                          "finish_reason": None}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="fake-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class SmtpSink:
+    """
+    Accepts any SMTP conversation (HELO/EHLO, MAIL, RCPT, DATA, RSET, NOOP,
+    QUIT) and counts the messages and recipients it receives.
+    """
+    def __init__(self, host="127.0.0.1", port=0):
+        self.messages = 0
+        self.recipients = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        sink = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(line.encode() + b"\r\n")
+
+            def handle(self):
+                with sink._lock:
+                    sink.connections += 1
+                self.reply("220 bench-sink ESMTP")
+                rcpts = 0
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    cmd = line.decode("utf-8", "replace").strip().upper()
+                    if cmd.startswith("EHLO"):
+                        self.wfile.write(b"250-bench-sink\r\n250 8BITMIME\r\n")
+                    elif cmd.startswith("RCPT"):
+                        rcpts += 1
+                        self.reply("250 OK")
+                    elif cmd.startswith("DATA"):
+                        self.reply("354 End data with <CR><LF>.<CR><LF>")
+                        while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                            pass
+                        with sink._lock:
+                            sink.messages += 1
+                            sink.recipients += rcpts
+                        rcpts = 0
+                        self.reply("250 OK queued")
+                    elif cmd.startswith("QUIT"):
+                        self.reply("221 Bye")
+                        return
+                    elif cmd.startswith("RSET"):
+                        rcpts = 0
+                        self.reply("250 OK")
+                    else:
+                        # HELO, MAIL, NOOP and anything else.
+                        self.reply("250 OK")
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self.server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def address(self):
+        return self.server.server_address[:2]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="smtp-sink", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeTwitter:
+    """
+    Accepts tweets on POST /2/tweets. Each account (the OAuth1 consumer key)
+    may post `limit` tweets per `window_s` seconds; past that it gets a 429
+    until the window resets, as x-rate-limit-reset announces. Records every
+    accepted (account, text) in `posted`.
+    """
+    def __init__(self, limit=10, window_s=2.0, host="127.0.0.1", port=0):
+        self.limit = limit
+        self.window_s = window_s
+        self.posted = []
+        self.rate_limited = 0
+        self._windows = {}          # account -> (window start, tweets in window)
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/2/tweets"
+
+    def per_account(self):
+        return dict(Counter(account for account, _ in self.posted))
+
+    def duplicates(self):
+        return sum(n - 1 for n in Counter(text for _, text in self.posted).values() if n > 1)
+
+    def _admit(self, account, text):
+        """Returns (status, remaining, reset epoch) and records accepted tweets."""
+        with self._lock:
+            now = time.time()
+            start, used = self._windows.get(account, (now, 0))
+            if now - start >= self.window_s:
+                start, used = now, 0
+            reset = start + self.window_s
+            if used >= self.limit:
+                self.rate_limited += 1
+                return 429, 0, reset
+            self._windows[account] = (start, used + 1)
+            self.posted.append((account, text))
+            return 201, self.limit - used - 1, reset
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                key = re.search(r'oauth_consumer_key="([^"]*)"', self.headers.get("Authorization", ""))
+                status, remaining, reset = fake._admit(key.group(1) if key else "", body.get("text", ""))
+                payload = json.dumps({"data": {"id": str(len(fake.posted)), "text": body.get("text", "")}}
+                                     if status == 201 else {"title": "Too Many Requests"}).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.send_header("x-rate-limit-limit", str(fake.limit))
+                self.send_header("x-rate-limit-remaining", str(remaining))
+                self.send_header("x-rate-limit-reset", f"{reset:.3f}")
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="fake-twitter", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,445 @@
+"""
+Route-level load benchmark.
+
+Starts the app in a subprocess (threaded werkzeug server) on a scratch
+SQLite database, with a FakeOpenAI server and an SmtpSink standing in for
+OpenAI and the mail server (and a FakeTwitter for the Twitter API), then drives these scenarios:
+
+  tracking    hit storm on /t/o, /t/c and the legacy /track_open, /track_click
+  analytics   /analytics over many campaigns with large recipient tables
+  ai_fill     /ai_fill_all against the fake OpenAI latency
+  newsletter  /send_newsletter_emails to N recipients, timed until the
+              mailing job has delivered everything to the sink
+  tweets      /schedule_tweets for N tweets over several accounts against a
+              rate-limited FakeTwitter, timed until every tweet is posted;
+              also reports the per-account spread, 429s and duplicate posts
+
+For every route it reports count, errors, p50/p95/p99 latency and
+throughput, and compares them with a stored baseline:
+
+    python benchmarks/routes.py                          # all scenarios
+    python benchmarks/routes.py --scenarios tracking,ai_fill --quick
+    python benchmarks/routes.py --save-baseline          # write benchmarks/baseline.json
+    python benchmarks/routes.py --fail-on-regression     # exit 1 if worse than baseline
+
+A route regresses when its p95 grows, or its throughput drops, by more
+than --tolerance (default 25%) relative to the baseline. Numbers are only
+comparable on the same machine: re-record the baseline when it changes.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from fakes import FakeOpenAI, FakeTwitter, SmtpSink
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+SERVE = r"""
+import os, app as m
+from werkzeug.serving import make_server
+make_server("127.0.0.1", int(os.environ["BENCH_PORT"]), m.app, threaded=True).serve_forever()
+"""
+
+SCENARIOS = ("tracking", "analytics", "ai_fill", "newsletter", "tweets")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[k]
+
+
+def summarize(latencies, errors, wall):
+    values = sorted(latencies)
+    return {
+        "count": len(values) + errors,
+        "errors": errors,
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "rps": round(len(values) / wall, 1) if wall else 0.0,
+    }
+
+
+class LoadRunner:
+    """
+    Fires (route_name, method, path, kwargs) requests from `concurrency`
+    threads, each with its own keep-alive requests.Session, and records
+    per-route latencies. A request counts as an error on a network failure
+    or a status >= 400.
+    """
+    def __init__(self, base_url, concurrency):
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self._local = threading.local()
+
+    def _session(self):
+        s = getattr(self._local, "session", None)
+        if s is None:
+            s = self._local.session = requests.Session()
+        return s
+
+    def _one(self, item):
+        name, method, path, kwargs = item
+        t0 = time.perf_counter()
+        try:
+            resp = self._session().request(method, self.base_url + path, allow_redirects=False,
+                                            timeout=120, **kwargs)
+            resp.content
+            ok = resp.status_code < 400
+        except requests.RequestException:
+            ok = False
+        return name, time.perf_counter() - t0, ok
+
+    def run(self, items):
+        latencies, errors = {}, {}
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for name, elapsed, ok in pool.map(self._one, items):
+                latencies.setdefault(name, [])
+                errors.setdefault(name, 0)
+                if ok:
+                    latencies[name].append(elapsed)
+                else:
+                    errors[name] += 1
+        wall = time.perf_counter() - t0
+        return {name: summarize(latencies[name], errors[name], wall) for name in latencies}, wall
+
+
+class Bench:
+    def __init__(self, args):
+        self.args = args
+        self.tmp = tempfile.mkdtemp(prefix="impacthub-bench-")
+        self.openai = FakeOpenAI(latency_ms=args.llm_latency_ms, jitter_ms=args.llm_jitter_ms,
+                                 items=args.llm_items).start()
+        self.smtp = SmtpSink().start()
+        self.twitter = FakeTwitter(limit=args.tweet_rate_limit, window_s=args.tweet_rate_window).start()
+        self.port = free_port()
+        self.env = dict(
+            os.environ,
+            DATABASE_URL="sqlite:///" + os.path.join(self.tmp, "bench.db"),
+            OPENAI_BASE_URL=self.openai.base_url,
+            OPENAI_API_KEY="bench",
+            SMTP_RATE_PER_HOST=str(args.smtp_rate),
+            TWITTER_API_URL=self.twitter.url,
+            TWEET_POLL_INTERVAL="0.5",
+            BENCH_PORT=str(self.port),
+        )
+        # The harness seeds the same database through the app's own models.
+        os.environ.update({k: self.env[k] for k in ("DATABASE_URL", "OPENAI_BASE_URL", "OPENAI_API_KEY")})
+        sys.path.insert(0, ROOT)
+        import app as appmod
+        self.m = appmod
+        self.app = appmod.app
+        with self.app.app_context():
+            appmod.init_db()
+            cfg = appmod.db.session.get(appmod.EmailBotConfig, 1)
+            cfg.method, cfg.smtp_host, cfg.smtp_port = "local", self.smtp.address[0], str(self.smtp.address[1])
+            appmod.db.session.commit()
+        self.server = None
+        self.runner = LoadRunner(f"http://127.0.0.1:{self.port}", args.concurrency)
+
+    def start_server(self):
+        self.log = open(os.path.join(self.tmp, "server.log"), "w")
+        self.server = subprocess.Popen([sys.executable, "-c", SERVE], cwd=ROOT, env=self.env,
+                                       stdout=self.log, stderr=subprocess.STDOUT)
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            try:
+                with socket.create_connection(("127.0.0.1", self.port), timeout=0.5):
+                    return
+            except OSError:
+                if self.server.poll() is not None:
+                    break
+                time.sleep(0.1)
+        raise RuntimeError(f"App server did not start; see {self.log.name}")
+
+    def stop(self):
+        if self.server:
+            self.server.terminate()
+            self.server.wait(timeout=10)
+            self.log.close()
+        self.openai.stop()
+        self.smtp.stop()
+        self.twitter.stop()
+
+    # ---- seeding ---------------------------------------------------------
+    def seed_campaign(self, cid, name, recipients, **columns):
+        m = self.m
+        with self.app.app_context():
+            c = m.Campaign(id=cid, name=name, start_date="2026-01-01", end_date="2026-12-31")
+            for key, value in columns.items():
+                setattr(c, key, value)
+            m.db.session.add(c)
+            m.db.session.commit()
+            batch = []
+            for i in range(recipients):
+                batch.append({"campaign_id": cid, "email": f"user{i}@{cid}.example.org"})
+                if len(batch) == 10000:
+                    m.db.session.execute(m.db.insert(m.RecipientStatus), batch)
+                    batch = []
+            if batch:
+                m.db.session.execute(m.db.insert(m.RecipientStatus), batch)
+            c.sent_count = recipients
+            m.db.session.commit()
+            return [rid for rid, in m.db.session.query(m.RecipientStatus.id)
+                    .filter_by(campaign_id=cid).order_by(m.RecipientStatus.id)]
+
+    # ---- scenarios -------------------------------------------------------
+    def scenario_tracking(self):
+        a = self.args
+        rids = self.seed_campaign("trk00001", "Tracking storm", a.recipients)
+        with self.app.app_context():
+            tokens = [self.m.make_tracking_token("trk00001", rid) for rid in rids]
+        items = []
+        for _ in range(a.hits):
+            i = random.randrange(len(rids))
+            roll = random.random()
+            if roll < 0.4:
+                items.append(("GET /t/o/<token>", "GET", f"/t/o/{tokens[i]}", {}))
+            elif roll < 0.6:
+                items.append(("GET /t/c/<token>", "GET", f"/t/c/{tokens[i]}", {}))
+            elif roll < 0.85:
+                items.append(("GET /track_open/<cid>/<email>", "GET",
+                              f"/track_open/trk00001/user{i}@trk00001.example.org", {}))
+            else:
+                items.append(("GET /track_click/<cid>/<email>", "GET",
+                              f"/track_click/trk00001/user{i}@trk00001.example.org", {}))
+        routes, wall = self.runner.run(items)
+        return {"routes": routes, "wall_s": round(wall, 2)}
+
+    def scenario_analytics(self):
+        a = self.args
+        for n in range(a.campaigns):
+            self.seed_campaign(f"ana{n:05d}", f"Analytics {n}", a.recipients_per_campaign)
+        items = []
+        for i in range(a.analytics_requests):
+            if i % 4 == 3:
+                items.append(("GET /analytics?per_page=500", "GET", "/analytics?per_page=500", {}))
+            else:
+                items.append(("GET /analytics", "GET", "/analytics", {}))
+        routes, wall = self.runner.run(items)
+        return {"routes": routes, "wall_s": round(wall, 2)}
+
+    def scenario_ai_fill(self):
+        a = self.args
+        goals = [f"Raise funds for community project #{i % max(1, a.ai_distinct_goals)}"
+                 for i in range(a.ai_requests)]
+        items = [("POST /ai_fill_all", "POST", "/ai_fill_all",
+                  {"json": {"campaign_goal": g, "typedCampaignName": "", "typedObjective": "",
+                            "typedAudience": ""}})
+                 for g in goals]
+        # One untimed call first: the app imports the OpenAI client lazily.
+        self.runner.run(items[:1])
+        before = self.openai.requests
+        routes, wall = self.runner.run(items)
+        return {"routes": routes, "wall_s": round(wall, 2), "llm_calls": self.openai.requests - before}
+
+    def scenario_newsletter(self):
+        a = self.args
+        m = self.m
+        self.seed_campaign("nws00001", "Newsletter", a.newsletter_recipients,
+                           prompts_emails=json.dumps(["Hello from the benchmark.", "Thanks for your support!"]))
+        before = self.smtp.messages
+        routes, _ = self.runner.run([("POST /send_newsletter_emails/<cid>", "POST",
+                                      "/send_newsletter_emails/nws00001", {})])
+        t0 = time.perf_counter()
+        status = None
+        while time.perf_counter() - t0 < a.newsletter_timeout:
+            with self.app.app_context():
+                m.db.session.expire_all()
+                job = (m.MailingJob.query.filter_by(campaign_id="nws00001")
+                       .order_by(m.MailingJob.id.desc()).first())
+                status = job.status if job else None
+                sent = job.sent_count if job else 0
+                total = job.total if job else 0
+            if status in ("done", "interrupted"):
+                break
+            time.sleep(0.2)
+        wall = time.perf_counter() - t0
+        delivered = self.smtp.messages - before
+        return {
+            "routes": routes,
+            "job": {"status": status, "total": total, "sent": sent, "delivered_to_sink": delivered,
+                    "wall_s": round(wall, 2),
+                    "messages_per_s": round(delivered / wall, 1) if wall else 0.0},
+        }
+
+
+    def scenario_tweets(self):
+        a = self.args
+        m = self.m
+        texts = [f"Benchmark tweet {i} #impact" for i in range(a.tweets)]
+        self.seed_campaign("twt00001", "Tweets", 0, prompts_tweets=json.dumps(texts))
+        with self.app.app_context():
+            for i in range(a.tweet_accounts):
+                creds = {"API_KEY": f"acct{i}", "API_SECRET_KEY": "s", "ACCESS_TOKEN": "t",
+                         "ACCESS_TOKEN_SECRET": "u"}
+                m.db.session.add(m.TwitterBotConfig(name=f"bench {i}", credentials_json=json.dumps(creds)))
+            m.db.session.commit()
+        before, limited_before = len(self.twitter.posted), self.twitter.rate_limited
+        routes, _ = self.runner.run([("POST /schedule_tweets/<cid>", "POST",
+                                      "/schedule_tweets/twt00001", {"data": {"interval_minutes": "0"}})])
+        t0 = time.perf_counter()
+        counts = {}
+        while time.perf_counter() - t0 < a.tweet_timeout:
+            with self.app.app_context():
+                m.db.session.expire_all()
+                counts = m.tweet_queue_counts("twt00001")
+            if counts["posted"] + counts["failed"] >= len(texts):
+                break
+            time.sleep(0.2)
+        wall = time.perf_counter() - t0
+        delivered = len(self.twitter.posted) - before
+        return {
+            "routes": routes,
+            "job": {"label": "tweet queue", "status": counts, "total": len(texts), "sent": counts.get("posted", 0),
+                    "delivered_to_sink": delivered, "duplicates": self.twitter.duplicates(),
+                    "rate_limited": self.twitter.rate_limited - limited_before,
+                    "per_account": self.twitter.per_account(), "wall_s": round(wall, 2),
+                    "messages_per_s": round(delivered / wall, 1) if wall else 0.0},
+        }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Yields (scenario, route, metric, base, now, change, regressed) rows.
+    """
+    for scenario, data in results.items():
+        base_routes = (baseline.get(scenario) or {}).get("routes", {})
+        for route, now in data.get("routes", {}).items():
+            base = base_routes.get(route)
+            if not base:
+                continue
+            for metric, higher_is_worse in (("p95_ms", True), ("rps", False)):
+                b, n = base.get(metric) or 0, now.get(metric) or 0
+                if not b:
+                    continue
+                change = (n - b) / b
+                regressed = change > tolerance if higher_is_worse else change < -tolerance
+                yield scenario, route, metric, b, n, change, regressed
+        base_job = (baseline.get(scenario) or {}).get("job")
+        if base_job and data.get("job") and base_job.get("messages_per_s"):
+            b, n = base_job["messages_per_s"], data["job"].get("messages_per_s") or 0
+            change = (n - b) / b
+            yield scenario, base_job.get("label", "mailing job"), "messages_per_s", b, n, change, change < -tolerance
+
+
+def print_report(results):
+    print(f"{'scenario':<11} {'route':<38} {'count':>6} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'req/s':>8}")
+    for scenario, data in results.items():
+        for route, r in data.get("routes", {}).items():
+            print(f"{scenario:<11} {route:<38} {r['count']:>6} {r['errors']:>4} {r['p50_ms']:>9.1f} "
+                  f"{r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['rps']:>8.1f}")
+        if data.get("job"):
+            j = data["job"]
+            print(f"{scenario:<11} {j.get('label', 'mailing job'):<38} {j['delivered_to_sink']:>6} "
+                  f"{'':>4} status={j['status']} in {j['wall_s']}s = {j['messages_per_s']} msg/s")
+            if "duplicates" in j:
+                print(f"{'':<11} {'':<38} duplicates={j['duplicates']} 429s={j['rate_limited']} "
+                      f"per account={j['per_account']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--quick", action="store_true", help="small sizes for a smoke run")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--recipients", type=int, default=10000, help="tracking campaign size")
+    parser.add_argument("--hits", type=int, default=20000, help="tracking requests")
+    parser.add_argument("--campaigns", type=int, default=300, help="campaigns for /analytics")
+    parser.add_argument("--recipients-per-campaign", type=int, default=1000)
+    parser.add_argument("--analytics-requests", type=int, default=400)
+    parser.add_argument("--ai-requests", type=int, default=100)
+    parser.add_argument("--ai-distinct-goals", type=int, default=100,
+                        help="distinct goals; fewer than --ai-requests exercises the suggestion cache")
+    parser.add_argument("--newsletter-recipients", type=int, default=10000)
+    parser.add_argument("--newsletter-timeout", type=float, default=600)
+    parser.add_argument("--tweets", type=int, default=200)
+    parser.add_argument("--tweet-accounts", type=int, default=3)
+    parser.add_argument("--tweet-rate-limit", type=int, default=20, help="FakeTwitter tweets per account per window")
+    parser.add_argument("--tweet-rate-window", type=float, default=2.0, help="FakeTwitter rate-limit window (s)")
+    parser.add_argument("--tweet-timeout", type=float, default=120)
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--llm-jitter-ms", type=float, default=50)
+    parser.add_argument("--llm-items", type=int, default=5)
+    parser.add_argument("--smtp-rate", type=float, default=0, help="SMTP_RATE_PER_HOST for the run (0 = unlimited)")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+    if args.quick:
+        args.recipients, args.hits = 2000, 2000
+        args.campaigns, args.recipients_per_campaign, args.analytics_requests = 50, 200, 100
+        args.ai_requests, args.ai_distinct_goals = 20, 20
+        args.newsletter_recipients = 1000
+        args.tweets = 60
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    bench = Bench(args)
+    results = {}
+    try:
+        bench.start_server()
+        for name in scenarios:
+            print(f"running {name}...", file=sys.stderr)
+            results[name] = getattr(bench, f"scenario_{name}")()
+    finally:
+        bench.stop()
+
+    report = {
+        "meta": {"date": datetime.datetime.utcnow().isoformat(timespec="seconds"),
+                 "python": platform.python_version(), "platform": platform.platform(),
+                 "args": {k: v for k, v in vars(args).items() if k not in ("out", "baseline")}},
+        "results": results,
+    }
+    print_report(results)
+    if args.out:
+        with open(args.out, "w") as fh:
+            json.dump(report, fh, indent=2)
+
+    regressions = 0
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh).get("results", {})
+        print(f"\nvs baseline {args.baseline} (tolerance {args.tolerance:.0%}):")
+        for scenario, route, metric, b, n, change, regressed in compare(results, baseline, args.tolerance):
+            flag = "REGRESSION" if regressed else ""
+            regressions += regressed
+            print(f"  {scenario:<11} {route:<38} {metric:<15} {b:>9.1f} -> {n:>9.1f} ({change:+.0%}) {flag}")
+    if args.save_baseline:
+        with open(args.baseline, "w") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"\nbaseline written to {args.baseline}")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
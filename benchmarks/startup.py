@@ -0,0 +1,93 @@
+"""
+Worker cold-start benchmark.
+
+Spawns fresh interpreters and times, for each one:
+  import     - `import app` (which also binds the database)
+  first_req  - the first request served (GET /campaign_overview)
+
+    python benchmarks/startup.py --runs 15
+    python benchmarks/startup.py --importtime   # slowest imports of one run
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import json, time
+t0 = time.perf_counter()
+import app as m
+t1 = time.perf_counter()
+with m.app.app_context():
+    m.db.create_all()
+t2 = time.perf_counter()
+m.app.test_client().get("/campaign_overview")
+t3 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "first_req": t3 - t2}))
+"""
+
+def run_probe(env):
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def percentile(values, pct):
+    values = sorted(values)
+    k = (len(values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+def slowest_imports(env, top):
+    """
+    Top-level packages by cumulative import time, from `python -X importtime`.
+    """
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if "." not in name:
+            rows.append((int(cumulative_us), name))
+    return sorted(rows, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--importtime", action="store_true", help="list the slowest top-level imports")
+    parser.add_argument("--json", action="store_true", help="print raw results as JSON")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="impacthub-startup-")
+    env = dict(os.environ, DATABASE_URL="sqlite:///" + os.path.join(tmp, "bench.db"))
+
+    if args.importtime:
+        for cumulative_us, name in slowest_imports(env, 15):
+            print(f"{cumulative_us / 1000:9.1f} ms  {name}")
+        return
+
+    samples = [run_probe(env) for _ in range(args.runs)]
+    summary = {}
+    for key in ("import", "first_req"):
+        values = [s[key] * 1000 for s in samples]
+        summary[key] = {"median_ms": round(statistics.median(values), 1),
+                        "p95_ms": round(percentile(values, 95), 1)}
+    total = [sum(s.values()) * 1000 for s in samples]
+    summary["total"] = {"median_ms": round(statistics.median(total), 1),
+                        "p95_ms": round(percentile(total, 95), 1)}
+
+    if args.json:
+        print(json.dumps({"runs": args.runs, "summary": summary, "samples": samples}, indent=2))
+        return
+    print(f"{args.runs} cold starts")
+    for key, stats in summary.items():
+        print(f"  {key:<10} median {stats['median_ms']:8.1f} ms   p95 {stats['p95_ms']:8.1f} ms")
+
+if __name__ == "__main__":
+    main()